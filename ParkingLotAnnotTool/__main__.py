@@ -1,16 +1,20 @@
 # ParkingLotAnnotTool/__main__.py
 
+import multiprocessing
 import sys
 from PyQt6.QtWidgets import QApplication
 
 import ParkingLotAnnotTool.public.signals as Signals
 import ParkingLotAnnotTool.public.hotkey as HotKey
-Signals.initialize()
-HotKey.initialize()
 
-from mainwindow import MainWindow
 
 def main():
+    # Initialized here rather than at import time: spawned worker processes
+    # re-import this module and must not start their own hotkey listener.
+    Signals.initialize()
+    HotKey.initialize()
+    from mainwindow import MainWindow
+
     print("ParkingLotAnnotTool is running.")
     app = QApplication(sys.argv)
     app.setStyle("WindowsVista")  # white mode explicitly
@@ -19,4 +23,5 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # crop processes of the pyinstaller executable
     main()
@@ -20,12 +20,14 @@ class ClassifyConditionsWidget(QWidget):
         self.conditions_data = ConditionsData()
         self.conditions_data_info = ConditionsDataInfoWidget(self.conditions_data)
         self.conditions_data.current_frame_changed.connect(self.conditions_data_info.update)
+        self.conditions_data.error.connect(self.print_error)
         self.setting_dialog = SettingsDialog(self.conditions_data)
 
         self.canvas_picture = CanvasPicture()
         self.canvas_scroll = CanvasScroll(self, self.canvas_picture)
         self.seekbar = SeekBarWidget()
         self.seekbar.valueChanged.connect(self.on_seekbar_value_changed)
+        self.seekbar.playback.set_source(self.conditions_data.is_frame_ready, self.conditions_data.prefetch_frames)
 
         self.open_action = new_action(self, 'Open', icon=read_icon('open_file.png'), slot=self.click_open)
         self.save_action = new_action(self, 'Save', icon=read_icon('save.png'), slot=self.click_save, shortcut=QKeySequence("Ctrl+S"))
@@ -102,7 +104,7 @@ class ClassifyConditionsWidget(QWidget):
         self.sunny_action.setEnabled(True)
         self.rainy_action.setEnabled(False)
         self.seekbar.add_rainy_condition()
-        self.conditions_list.addItem(f'rainy, {self.seekbar.get_value_str()}')
+        self.conditions_list.addItem(f'rainy, {self.conditions_data.current_frame()}')
 
     def click_sunny(self) -> None:
         traceback_and_exit(self.click_sunny_impl)
@@ -113,7 +115,7 @@ class ClassifyConditionsWidget(QWidget):
         self.sunny_action.setEnabled(False)
         self.rainy_action.setEnabled(True)
         self.seekbar.add_sunny_condition()
-        self.conditions_list.addItem(f'sunny, {self.seekbar.get_value_str()}')
+        self.conditions_list.addItem(f'sunny, {self.conditions_data.current_frame()}')
 
     def click_day(self):
         traceback_and_exit(self.click_day_impl)
@@ -124,7 +126,7 @@ class ClassifyConditionsWidget(QWidget):
         self.day_action.setEnabled(False)
         self.night_action.setEnabled(True)
         self.seekbar.add_day_condition()
-        self.conditions_list.addItem(f'day, {self.seekbar.get_value_str()}')
+        self.conditions_list.addItem(f'day, {self.conditions_data.current_frame()}')
     
     def click_night(self):
         traceback_and_exit(self.click_night_impl)
@@ -135,7 +137,7 @@ class ClassifyConditionsWidget(QWidget):
         self.day_action.setEnabled(True)
         self.night_action.setEnabled(False)
         self.seekbar.add_night_condition()
-        self.conditions_list.addItem(f'night, {self.seekbar.get_value_str()}')
+        self.conditions_list.addItem(f'night, {self.conditions_data.current_frame()}')
 
     def click_undo(self) -> None:
         traceback_and_exit(self.click_undo_impl)
@@ -147,37 +149,32 @@ class ClassifyConditionsWidget(QWidget):
         label = parts[0]
         frame = parts[1]
         if   label == "sunny":
-            self.seekbar.remove_sunny_condition(int(frame))
+            self.seekbar.remove_sunny_condition(self.conditions_data.frame_index(frame))
             self.sunny_action.setEnabled(True)
             self.rainy_action.setEnabled(False)
-            self.conditions_data.remove_conditions(
-                key=self.conditions_list.selectedItems()[0].text(),
-                conditions={"label": "sunny", "frame": frame})
+            self.conditions_data.remove_label('weather', frame)
         elif label == "rainy":
-            self.seekbar.remove_rainy_condition(int(frame))
+            self.seekbar.remove_rainy_condition(self.conditions_data.frame_index(frame))
             self.sunny_action.setEnabled(False)
             self.rainy_action.setEnabled(True)
-            self.conditions_data.remove_conditions(
-                key=self.conditions_list.selectedItems()[0].text(),
-                conditions={"label": "rainy", "frame": frame})
+            self.conditions_data.remove_label('weather', frame)
         elif label == 'day':
-            self.seekbar.remove_day_condition(int(frame))
+            self.seekbar.remove_day_condition(self.conditions_data.frame_index(frame))
             self.day_action.setEnabled(True)
             self.night_action.setEnabled(False)
-            self.conditions_data.remove_conditions(
-                key=self.conditions_list.selectedItems()[0].text(),
-                conditions={'label': 'day', 'frame': frame})
+            self.conditions_data.remove_label('time', frame)
         elif label == 'night':
-            self.seekbar.remove_night_condition(int(frame))
+            self.seekbar.remove_night_condition(self.conditions_data.frame_index(frame))
             self.day_action.setEnabled(False)
             self.night_action.setEnabled(True)
-            self.conditions_data.remove_conditions(
-                key=self.conditions_list.selectedItems()[0].text(),
-                conditions={'label': 'night', 'frame': frame})
+            self.conditions_data.remove_label('time', frame)
         if self.conditions_list.count() == 0:
             self.sunny_action.setEnabled(True)
             self.rainy_action.setEnabled(True)
 
+    def print_error(self, message: str):
+        global_signals.print(f"[{self.__class__.__name__}] failed: {message}")
+
     def press_view_zoom_fit(self) -> None:
         traceback_and_exit(self.press_view_zoom_fit_impl)
     def press_view_zoom_fit_impl(self) -> None:
@@ -194,7 +191,7 @@ class ClassifyConditionsWidget(QWidget):
         self.setting_dialog.popup()
 
     def on_seekbar_value_changed(self, value):
-        self.conditions_data.update_current_frame(self.seekbar.get_value_str())
+        self.conditions_data.update_current_frame(self.conditions_data.frame_at(value))
         self.canvas_picture.set_picture(self.conditions_data.current_img())
 
     def on_conditionslist_itemselection_changed(self):
@@ -205,7 +202,7 @@ class ClassifyConditionsWidget(QWidget):
         label = parts[0]
         frame = parts[1]
         self.canvas_picture.set_picture(self.conditions_data.current_img())
-        self.seekbar.set_value(int(frame))
+        self.seekbar.set_value(self.conditions_data.frame_index(frame))
         if   label == "sunny":
             self.sunny_action.setEnabled(False)
             self.rainy_action.setEnabled(True)
@@ -1,22 +1,32 @@
-import cv2
+import bisect
 import json
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 from PyQt6.QtCore import QObject, pyqtSignal, Qt
 from PyQt6.QtWidgets import *
 from PyQt6.QtWidgets import QMessageBox as QMB
 from ..general.dict_to_layout import dict_to_layout
+from ..general.framecache import FrameCache, FramePrefetcher
+from ..general.framecatalog import CATALOG_NAME, FrameCatalog, frame_sort_key
+from ..general.previewstore import PREVIEW_DIR_NAME, PreviewBuildWorker, read_preview
 
 
 class ConditionsData(QObject):
 
     current_frame_changed = pyqtSignal()
+    error = pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
         self._json_path = None
         self._video_path: str = None
         self._conditions: List[Dict] = []
+        # Condition frames in frame order with their frame_sort_key()s, and per
+        # axis the keys of the frames where its label is set with the labels
+        # themselves; rebuilt on load, kept sorted on edit.
+        self._condition_frames: List[str] = []
+        self._condition_keys: List[Tuple[int, str]] = []
+        self._change_points: Dict[str, Tuple[List[Tuple[int, str]], List[str]]] = {}
         self._initial_time = None
         self._day_start_time = None
         self._night_start_time = None
@@ -26,12 +36,18 @@ class ConditionsData(QObject):
 
         self._current_frame = "00000"
         self._current_time = None
+        self._catalog = FrameCatalog(CATALOG_NAME)
+        self._preview_worker: Optional[PreviewBuildWorker] = None
+        self._frame_cache = FrameCache(max_mbytes=256)
+        self._prefetcher = FramePrefetcher(self._frame_cache, self.load_img)
+        self._prefetcher.failed.connect(self.on_prefetch_failed)
 
     def reset(self):
         pass
 
     def load(self) -> bool:
         self.may_save()
+        self._prefetcher.drop_pending()
         with open(self._json_path, 'r', encoding='utf-8') as file:
             data = json.load(file)
         self._video_path = data['video_path']
@@ -45,14 +61,19 @@ class ConditionsData(QObject):
                     'frame': d['frame'],
                     'labels': {'weather': d['label']}
                 })
+        self.build_change_points()
         self._initial_time = data['initial_time']
         self._day_start_time = data['day_start_time']
         self._night_start_time = data['night_start_time']
         self._interval = data['interval']
         self._dirty = False
         self._loaded = True
+        self._catalog = FrameCatalog(self.parent_dir() / CATALOG_NAME)
+        self._frame_cache.clear()
+        self._catalog.load(self.frames_dir())
+        self.start_preview_worker()
 
-        self._current_frame = "00000"
+        self._current_frame = self._catalog.frame_at(0)
         self.current_frame_changed.emit()
         return True
 
@@ -60,35 +81,68 @@ class ConditionsData(QObject):
         return self._current_frame
     
     def current_img(self):
-        image = cv2.imread((self.raw_data_dir() / (self.current_frame() + ".jpg")))
-        return cv2.resize(image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_NEAREST)
+        img = self._frame_cache.get(self._current_frame)
+        if img is None:
+            img = self.load_img(self._current_frame)
+            self._frame_cache.put(self._current_frame, img)
+        return img
+
+    def load_img(self, frame: str):
+        # Called from the prefetch thread too.
+        return read_preview(self.raw_data_dir(), self.preview_data_dir(), frame + ".jpg")
+
+    def on_prefetch_failed(self, frame, message: str):
+        self.error.emit(f"prefetch of {frame}: {message}")
+
+    def is_frame_ready(self, frame_idx: int) -> bool:
+        return self._catalog.frame_at(frame_idx) in self._frame_cache
+
+    def prefetch_frames(self, frame_indices):
+        self._prefetcher.request([self._catalog.frame_at(frame_idx) for frame_idx in frame_indices])
+
+    def start_preview_worker(self):
+        # Conditions never need full resolution; previews are built once in the background.
+        if self._preview_worker is not None:
+            self._preview_worker.stop()
+            self._preview_worker = None
+        if not self.raw_data_dir().exists():
+            return
+        self._preview_worker = PreviewBuildWorker(self.raw_data_dir(), self.preview_data_dir(), self.frame_names())
+        self._preview_worker.start()
 
     def update_current_frame(self, value):
         self._current_frame = value
         self.current_frame_changed.emit()
 
-    def get_label_find_by_frame(self, frame:str, axis: str):
-        if frame is None or not self._conditions:
+    def build_change_points(self):
+        conditions = sorted(self._conditions, key=lambda d: frame_sort_key(d["frame"]))
+        self._condition_frames = [d["frame"] for d in conditions]
+        self._condition_keys = [frame_sort_key(frame) for frame in self._condition_frames]
+        self._change_points = {}
+        for d in conditions:
+            for axis, label in d["labels"].items():
+                keys, labels = self._change_points.setdefault(axis, ([], []))
+                keys.append(frame_sort_key(d["frame"]))
+                labels.append(label)
+
+    def get_label_find_by_frame(self, frame: Optional[str], axis: str):
+        """Label of axis in effect at frame: the one set at the last change point at or before it."""
+        if frame is None or axis not in self._change_points:
             return None
-        for d in self._conditions:
-            if d["frame"] == frame:
-                return d["labels"].get(axis)
-        return self.prev_label(axis)
+        keys, labels = self._change_points[axis]
+        i = bisect.bisect_right(keys, frame_sort_key(frame))
+        if i == 0:
+            return None
+        return labels[i - 1]
 
     def get_frames_adjacent_label(self, frame):
-        if not self._conditions:
+        frames = self._condition_frames
+        if not frames:
             return None, None
-        frames = [d["frame"] for d in self._conditions]
-        sorted_values = sorted(frames)
-
-        for i in range(len(sorted_values) - 1):
-            if sorted_values[i] <= frame < sorted_values[i + 1]:
-                return sorted_values[i], sorted_values[i + 1]
-
-        if frame < sorted_values[0]:
-            return None, sorted_values[0]
-        elif frame >= sorted_values[-1]:
-            return sorted_values[-1], None
+        i = bisect.bisect_right(self._condition_keys, frame_sort_key(frame))
+        prev = frames[i - 1] if 0 < i else None
+        next = frames[i] if i < len(frames) else None
+        return prev, next
 
     def next_label_frame(self):
         prev, next = self.get_frames_adjacent_label(self._current_frame)
@@ -120,11 +174,30 @@ class ConditionsData(QObject):
     def raw_data_dir(self) -> Path:
         return self.parent_dir() / "raw"
 
+    def preview_data_dir(self) -> Path:
+        return self.parent_dir() / PREVIEW_DIR_NAME
+
+    def frames_dir(self) -> Path:
+        if self.raw_data_dir().exists():
+            return self.raw_data_dir()
+        if self.preview_data_dir().exists():
+            return self.preview_data_dir()
+        return self.raw_data_dir()
+
+    def frame_catalog(self) -> FrameCatalog:
+        return self._catalog
+
     def len_frames(self):
-        return len(list(self.raw_data_dir().glob("*.jpg")))
+        return len(self._catalog)
 
     def frame_names(self):
-        return [f'{i:05d}.jpg' for i in range(self.len_frames())]
+        return self._catalog.file_names()
+
+    def frame_at(self, idx: int) -> str:
+        return self._catalog.frame_at(idx)
+
+    def frame_index(self, frame: str) -> int:
+        return self._catalog.nearest_index(frame)
 
     def add_label(self, axis: str, value: str):
         for d in self._conditions:
@@ -138,6 +211,38 @@ class ConditionsData(QObject):
                 'frame': self._current_frame,
                 'labels': {axis: value}
             })
+            key = frame_sort_key(self._current_frame)
+            i = bisect.bisect_left(self._condition_keys, key)
+            self._condition_frames.insert(i, self._current_frame)
+            self._condition_keys.insert(i, key)
+        keys, labels = self._change_points.setdefault(axis, ([], []))
+        key = frame_sort_key(self._current_frame)
+        i = bisect.bisect_left(keys, key)
+        keys.insert(i, key)
+        labels.insert(i, value)
+        self._dirty = True
+        return True # is changed
+
+    def remove_label(self, axis: str, frame: str):
+        for d in self._conditions:
+            if d['frame'] == frame:
+                break
+        else:
+            return False
+        if axis not in d['labels']:
+            return False
+        del d['labels'][axis]
+        if not d['labels']:
+            self._conditions.remove(d)
+            i = bisect.bisect_left(self._condition_keys, frame_sort_key(frame))
+            del self._condition_frames[i]
+            del self._condition_keys[i]
+        keys, labels = self._change_points[axis]
+        i = bisect.bisect_left(keys, frame_sort_key(frame))
+        del keys[i]
+        del labels[i]
+        if not keys:
+            del self._change_points[axis]
         self._dirty = True
         return True # is changed
 
@@ -2,6 +2,8 @@ from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 from PyQt6.QtWidgets import *
 
+from ParkingLotAnnotTool.core.general.playback import SPEEDS, PlaybackController
+
 
 class SeekBarWidget(QWidget):
     valueChanged = pyqtSignal(int)
@@ -16,6 +18,10 @@ class SeekBarWidget(QWidget):
         self.slider.valueChanged.connect(self.emit_value_changed)
 
         self.conditions = {'sunny': set([]), 'rainy': set([]), 'day': set([]), 'night': set([])}
+        # Bumped whenever conditions change; the marker track is cached per version.
+        self._conditions_version = 0
+        self._marker_key = None
+        self._marker_pixmap = None
 
         self.prev_button = QPushButton("◀")
         self.next_button = QPushButton("▶")
@@ -29,6 +35,19 @@ class SeekBarWidget(QWidget):
         self.timer.setInterval(100)  # msec
         self.timer.timeout.connect(self.update_index)
 
+        self.play_button = QPushButton("Play")
+        self.play_button.setCheckable(True)
+        self.play_button.toggled.connect(self.toggle_playback)
+        self.speed_combo = QComboBox()
+        for speed in SPEEDS:
+            self.speed_combo.addItem(f"{speed}x", speed)
+        self.speed_combo.currentIndexChanged.connect(self.change_speed)
+
+        self.playback = PlaybackController(self)
+        self.playback.frame_requested.connect(self.slider.setValue)
+        self.playback.playing_changed.connect(self.play_button.setChecked)
+        self.slider.sliderPressed.connect(self.playback.stop)
+
         self.increment = 0
         self.long_press_detected = False
 
@@ -36,15 +55,30 @@ class SeekBarWidget(QWidget):
         layout.addWidget(self.prev_button)
         layout.addWidget(self.slider)
         layout.addWidget(self.next_button)
+        layout.addWidget(self.play_button)
+        layout.addWidget(self.speed_combo)
 
         self.setLayout(layout)
 
+    def toggle_playback(self, checked):
+        if not checked:
+            self.playback.stop()
+            return
+        self.playback.play(self.slider.value(), self.slider.maximum())
+        if not self.playback.is_playing():
+            self.play_button.setChecked(False)
+
+    def change_speed(self, index):
+        self.playback.set_speed(self.speed_combo.itemData(index))
+
     def start_next_timer(self):
+        self.playback.stop()
         self.increment = 1
         self.long_press_detected = False
         self.timer.start()
 
     def start_prev_timer(self):
+        self.playback.stop()
         self.increment = -1
         self.long_press_detected = False
         self.timer.start()
@@ -62,7 +96,11 @@ class SeekBarWidget(QWidget):
 
     def reset_conditions(self):
         self.conditions = {'sunny': set([]), 'rainy': set([]), 'day': set([]), 'night': set([])}
-        self.repaint()
+        self.conditions_changed()
+
+    def conditions_changed(self):
+        self._conditions_version += 1
+        self.update()
 
     def emit_value_changed(self, value):
         self.valueChanged.emit(value)
@@ -81,35 +119,59 @@ class SeekBarWidget(QWidget):
 
     def add_sunny_condition(self):
         self.conditions['sunny'].add(self.slider.value())
+        self.conditions_changed()
 
     def add_rainy_condition(self):
         self.conditions['rainy'].add(self.slider.value())
+        self.conditions_changed()
 
     def add_day_condition(self):
         self.conditions['day'].add(self.slider.value())
+        self.conditions_changed()
 
     def add_night_condition(self):
         self.conditions['night'].add(self.slider.value())
+        self.conditions_changed()
 
     def remove_sunny_condition(self, value):
         self.conditions['sunny'].remove(value)
+        self.conditions_changed()
 
     def remove_rainy_condition(self, value):
         self.conditions['rainy'].remove(value)
+        self.conditions_changed()
 
     def remove_day_condition(self, value):
         self.conditions['day'].remove(value)
+        self.conditions_changed()
 
     def remove_night_condition(self, value):
         self.conditions['night'].remove(value)
+        self.conditions_changed()
 
     def paintEvent(self, event):
         super().paintEvent(event)
         painter = QPainter(self)
-
+        painter.drawPixmap(0, 0, self.marker_pixmap())
+
+    def marker_pixmap(self) -> QPixmap:
+        key = (self._conditions_version, self.size(), self.slider.geometry(),
+               self.slider.minimum(), self.slider.maximum())
+        if key != self._marker_key:
+            self._marker_pixmap = self.render_markers()
+            self._marker_key = key
+        return self._marker_pixmap
+
+    def render_markers(self) -> QPixmap:
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(self.size() * dpr)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(pixmap)
         slider_rect = self.slider.geometry()
         slider_min = self.slider.minimum()
-        slider_max = self.slider.maximum()
+        slider_span = max(self.slider.maximum() - slider_min, 1)
         pen_rainy = QPen(QColor("cyan"), 2)
         pen_sunny = QPen(QColor("red"), 2)
         pen_day = QPen(QColor("orange"), 2)
@@ -133,6 +195,8 @@ class SeekBarWidget(QWidget):
                 painter.setPen(pen_night)
                 y1, y2 = center, center + line_length
             for condition in conditions_set:
-                marker = slider_rect.left() + slider_rect.width() * (condition - slider_min) / (slider_max - slider_min)
+                marker = slider_rect.left() + slider_rect.width() * (condition - slider_min) / slider_span
                 marker = int(marker)
                 painter.drawLine(marker, y1, marker, y2)
+        painter.end()
+        return pixmap
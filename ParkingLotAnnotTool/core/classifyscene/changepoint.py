@@ -0,0 +1,140 @@
+from typing import Callable, List
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QCoreApplication, QThread, pyqtSignal
+
+from ..definequad.imgcrop import LotCropPlan
+
+# Crops are reduced to this size before the statistics are computed.
+ANALYSIS_SIZE = 64
+HIST_BINS = 16
+# Frames on each side of a frame whose statistics are compared.
+WINDOW = 3
+# Proposals closer than this keep only the strongest.
+NMS_RADIUS = 5
+# Scores this many robust standard deviations above the median are proposed.
+THRESHOLD_MADS = 6.0
+# Frames analysed per chunk; bounds the memory read from the thumb store at once.
+CHUNK_SIZE = 512
+
+
+def quad_mask(quad: list, up_sample_rate: float, outline_width: int = 5, size: int = ANALYSIS_SIZE) -> np.ndarray:
+    """Pixels inside the lot of a size x size crop, without the drawn outline."""
+    contours = [(quad[0], quad[1]), (quad[2], quad[3]), (quad[4], quad[5]), (quad[6], quad[7])]
+    plan = LotCropPlan(contours, size, size, up_sample_rate, outline_width=1)
+    mask = np.zeros((size, size), dtype=np.uint8)
+    cv2.fillPoly(mask, [np.round(plan.contours).astype(np.int32).reshape(-1, 1, 2)], 1)
+    # Crops are stored at 224-256 px; erode past their outline at the analysis size.
+    border = int(np.ceil(outline_width * size / 224)) + 1
+    mask = cv2.erode(mask, np.ones((2 * border + 1, 2 * border + 1), dtype=np.uint8))
+    return mask.astype(bool)
+
+
+def reduce_frames(frames, size: int = ANALYSIS_SIZE) -> np.ndarray:
+    """Shrink a sequence of BGR frames to (N, size, size, 3)."""
+    reduced = np.zeros((len(frames), size, size, 3), dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        if frame is not None:
+            reduced[i] = cv2.resize(frame, (size, size), interpolation=cv2.INTER_AREA)
+    return reduced
+
+
+def frame_features(frames: np.ndarray, mask: np.ndarray, bins: int = HIST_BINS) -> np.ndarray:
+    """Per frame: the mean color over mask (3) and a per-channel histogram (3 * bins), all in [0, 1]."""
+    pixels = frames[:, mask]                                   # (N, M, 3)
+    n, m, c = pixels.shape
+    means = pixels.mean(axis=1) / 255.0
+    codes = np.minimum(pixels.astype(np.int64) * bins // 256, bins - 1)
+    codes += (np.arange(c) * bins)[None, None, :]
+    codes += (np.arange(n) * c * bins)[:, None, None]
+    hists = np.bincount(codes.ravel(), minlength=n * c * bins).reshape(n, c * bins) / m
+    return np.concatenate([means, hists], axis=1).astype(np.float32)
+
+
+def change_scores(features: np.ndarray, window: int = WINDOW) -> np.ndarray:
+    """Score of a change at each frame: distance between the mean features of the window before and after it."""
+    n = len(features)
+    scores = np.zeros(n, dtype=np.float32)
+    if n < 2:
+        return scores
+    cumsum = np.concatenate([np.zeros((1, features.shape[1]), dtype=np.float64), np.cumsum(features, axis=0)])
+    idx = np.arange(1, n)
+    lo = np.maximum(idx - window, 0)
+    hi = np.minimum(idx + window, n)
+    before = (cumsum[idx] - cumsum[lo]) / (idx - lo)[:, None]
+    after = (cumsum[hi] - cumsum[idx]) / (hi - idx)[:, None]
+    diff = np.abs(after - before)
+    # Mean color distance plus total variation of the per-channel histograms.
+    scores[1:] = diff[:, :3].sum(axis=1) + diff[:, 3:].sum(axis=1) / (2 * 3)
+    return scores
+
+
+def propose_change_points(scores: np.ndarray, threshold_mads: float = THRESHOLD_MADS,
+                          radius: int = NMS_RADIUS) -> np.ndarray:
+    """Indices of scores that are robust outliers and the maximum within radius."""
+    if len(scores) < 2:
+        return np.zeros(0, dtype=np.int64)
+    median = np.median(scores)
+    mad = np.median(np.abs(scores - median)) * 1.4826
+    threshold = median + threshold_mads * max(mad, 1e-6)
+    padded = np.pad(scores, radius, constant_values=-np.inf)
+    local_max = np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1).max(axis=1)
+    candidates = np.flatnonzero((scores > threshold) & (scores >= local_max))
+    # Plateaus of equal scores keep their first frame only.
+    if len(candidates):
+        keep = np.concatenate([[True], np.diff(candidates) > radius])
+        candidates = candidates[keep]
+    return candidates
+
+
+class ChangePointWorker(QThread):
+    """Propose frames where the look of a lot changes, from its crop sequence.
+
+    load_chunk(start, stop) returns the crops of frames [start, stop) reduced
+    to (n, ANALYSIS_SIZE, ANALYSIS_SIZE, 3). The proposed frame indices are
+    in proposals once finished is emitted. An error while loading emits error
+    with its message, then canceled.
+    """
+    progress = pyqtSignal(int)
+    finished = pyqtSignal()
+    canceled = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, load_chunk: Callable[[int, int], np.ndarray], num_frames: int, mask: np.ndarray):
+        super().__init__()
+        self.load_chunk = load_chunk
+        self.num_frames = num_frames
+        self.mask = mask
+        self.proposals: List[int] = []
+        self._is_canceled = False
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    def run(self):
+        try:
+            features = []
+            for start in range(0, self.num_frames, CHUNK_SIZE):
+                if self._is_canceled:
+                    self.canceled.emit()
+                    return
+                stop = min(start + CHUNK_SIZE, self.num_frames)
+                features.append(frame_features(self.load_chunk(start, stop), self.mask))
+                self.progress.emit(int((stop / self.num_frames) * 100))
+            if features:
+                scores = change_scores(np.concatenate(features))
+                self.proposals = propose_change_points(scores).tolist()
+        except Exception as e:
+            # Raised from run() finished would never be emitted and no proposals would arrive.
+            self.error.emit(repr(e))
+            self.canceled.emit()
+            return
+        self.finished.emit()
+
+    def cancel(self):
+        self._is_canceled = True
+
+    def stop(self):
+        self.cancel()
+        self.wait()
@@ -10,6 +10,7 @@ from ParkingLotAnnotTool.utils.resource import read_icon
 from ParkingLotAnnotTool.utils.trace import traceback_and_exit
 from ..general.action import new_action
 from ..general.canvas import CanvasPicture, CanvasScroll
+from .filmstrip import FilmstripView
 from .scenedata import SceneData, SceneDataInfoWidget
 from .seekbar import SeekBarWidget
 
@@ -26,10 +27,15 @@ class ClassifySceneWidget(QWidget):
         self.scene_data.selected_lot_idx_changed.connect(self.refresh)
         self.scene_data.selected_scene_idx_changed.connect(self.refresh)
         self.scene_data.selected_difficult_frame_idx_changed.connect(self.refresh)
+        self.scene_data.proposals_changed.connect(self.print_proposals)
+        self.scene_data.error.connect(self.print_error)
 
         self.canvas_picture = CanvasPicture()
         self.canvas_scroll = CanvasScroll(self, self.canvas_picture)
         self.seekbar = SeekBarWidget(self.scene_data)
+        self.filmstrip = FilmstripView(self.scene_data)
+        self.filmstrip.frame_clicked.connect(self.seekbar.set_value)
+        self.filmstrip.hide()
 
         self.open_action = new_action(self, 'Open', icon=read_icon('open_file.png'), slot=self.click_open)
         self.save_action = new_action(self, 'Save', icon=read_icon('save.png'), slot=self.click_save, shortcut=QKeySequence("Ctrl+S"))
@@ -40,6 +46,10 @@ class ClassifySceneWidget(QWidget):
         self.ambiguous_action = new_action(self, 'Ambiguous', icon_text='Ambiguous', slot=self.click_ambiguous, shortcut=QKeySequence("5"))
         self.view_zoom_fit_action = new_action(self, 'Zoom Fit', icon=read_icon('zoom_fit.png'), slot=self.press_view_zoom_fit)
         self.view_zoom_1_action = new_action(self, 'Zoom 100%', icon=read_icon('zoom_1.png'), slot=self.press_view_zoom_1)
+        self.propose_action = new_action(self, 'Propose Changes', icon_text='Propose', slot=self.click_propose)
+        self.next_proposal_action = new_action(self, 'Next Proposal', icon_text='Next', slot=self.click_next_proposal, shortcut=QKeySequence("N"))
+        self.accept_proposal_action = new_action(self, 'Accept Proposal', icon_text='Accept', slot=self.click_accept_proposal, shortcut=QKeySequence("A"))
+        self.filmstrip_action = new_action(self, 'Filmstrip', icon_text='Filmstrip', slot=self.click_filmstrip, shortcut=QKeySequence("Ctrl+G"), checkable=True)
         self.toolbar = QToolBar()
         self.toolbar.setOrientation(Qt.Orientation.Vertical)
         self.toolbar.addAction(self.open_action)
@@ -52,8 +62,13 @@ class ClassifySceneWidget(QWidget):
         self.toolbar.addAction(self.person_action)
         self.toolbar.addAction(self.ambiguous_action)
         self.toolbar.addSeparator()
+        self.toolbar.addAction(self.propose_action)
+        self.toolbar.addAction(self.next_proposal_action)
+        self.toolbar.addAction(self.accept_proposal_action)
+        self.toolbar.addSeparator()
         self.toolbar.addAction(self.view_zoom_fit_action)
         self.toolbar.addAction(self.view_zoom_1_action)
+        self.toolbar.addAction(self.filmstrip_action)
 
         self.lot_list = LotList(self.scene_data)
         self.scene_list = SceneList(self.scene_data)
@@ -62,6 +77,7 @@ class ClassifySceneWidget(QWidget):
         layout = QGridLayout(self)
         layout.addWidget(self.toolbar, 0, 0, 2, 1)  # (widget, row, col, row_size, col_size)
         layout.addWidget(self.canvas_scroll, 0, 1, 1, 1)
+        layout.addWidget(self.filmstrip, 0, 1, 1, 1)
         layout.addWidget(self.scene_data_info, 0, 2, 1, 1)
         layout.addWidget(self.seekbar, 1, 1, 1, 2)
         layout.addWidget(self.scene_list, 0, 3, 2, 1)
@@ -118,6 +134,37 @@ class ClassifySceneWidget(QWidget):
     def click_ambiguous_impl(self) -> None:
         self.scene_data.add_ambiguous_frame()
 
+    def click_propose(self) -> None:
+        traceback_and_exit(self.click_propose_impl)
+    def click_propose_impl(self) -> None:
+        if not self.scene_data.propose_change_points():
+            global_signals.print(f"[{self.__class__.__name__}] no lot crops to analyse: crop the lots first, or wait until the thumbnails are built.")
+            return
+        global_signals.print(f"[{self.__class__.__name__}] analysing {self.scene_data.current_lot_id()}...")
+
+    def click_next_proposal(self) -> None:
+        traceback_and_exit(self.click_next_proposal_impl)
+    def click_next_proposal_impl(self) -> None:
+        frame = self.scene_data.next_proposal_frame()
+        if frame is None:
+            return
+        self.seekbar.set_value(self.scene_data.frame_index(frame))
+
+    def click_accept_proposal(self) -> None:
+        traceback_and_exit(self.click_accept_proposal_impl)
+    def click_accept_proposal_impl(self) -> None:
+        if self.scene_data.label_is_exist_in_frame(self.scene_data.current_frame()):
+            global_signals.print(f"[{self.__class__.__name__}] a scene is already labelled at this frame.")
+            return
+        if not self.scene_data.accept_proposal():
+            global_signals.print(f"[{self.__class__.__name__}] no proposal to accept here; label the first scene with Free/Busy.")
+
+    def print_proposals(self):
+        global_signals.print(f"[{self.__class__.__name__}] {len(self.scene_data.proposals_with_current_lot_id())} proposed changes.")
+
+    def print_error(self, message: str):
+        global_signals.print(f"[{self.__class__.__name__}] failed: {message}")
+
     def press_view_zoom_fit(self) -> None:
         traceback_and_exit(self.press_view_zoom_fit_impl)
     def press_view_zoom_fit_impl(self) -> None:
@@ -128,13 +175,20 @@ class ClassifySceneWidget(QWidget):
     def press_view_zoom_1_impl(self) -> None:
         self.canvas_scroll.set_zoom(100)
 
+    def click_filmstrip(self) -> None:
+        traceback_and_exit(self.click_filmstrip_impl)
+    def click_filmstrip_impl(self) -> None:
+        # The filmstrip takes the place of the canvas while it is shown.
+        show_filmstrip = self.filmstrip_action.isChecked()
+        self.canvas_scroll.setVisible(not show_filmstrip)
+        self.filmstrip.setVisible(show_filmstrip)
+
     def refresh(self):
         self.canvas_picture.set_picture(self.scene_data.current_lot_img())
-        prev_scene = self.scene_data.prev_scene()
-        if prev_scene is None:
+        state = self.scene_data.frame_state()
+        if state.prev_scene is None:
             return
-        prev_label = prev_scene["label"]
-        prev_flags = prev_scene["flags"]
+        prev_label = state.label
         if   prev_label is None:
             self.busy_action.setEnabled(True)
             self.free_action.setEnabled(True)
@@ -145,20 +199,9 @@ class ClassifySceneWidget(QWidget):
             self.busy_action.setEnabled(False)
             self.free_action.setEnabled(True)
 
-        self.occluded_action.setEnabled(True)
-        for prev_flag in prev_flags:
-            if prev_flag == "occluded":
-                self.occluded_action.setEnabled(False)
-
-        if self.scene_data.is_ambiguous():
-            self.ambiguous_action.setEnabled(False)
-        else:
-            self.ambiguous_action.setEnabled(True)
-
-        if self.scene_data.person_exists():
-            self.person_action.setEnabled(False)
-        else:
-            self.person_action.setEnabled(True)
+        self.occluded_action.setEnabled(not state.is_occluded)
+        self.ambiguous_action.setEnabled(not state.is_ambiguous)
+        self.person_action.setEnabled(not state.person_exists)
 
 
 class SignalBlocker:
@@ -0,0 +1,224 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Hashable, Optional
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QAbstractListModel, QCoreApplication, QModelIndex, QObject, QSize, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QImage, QPixmap
+from PyQt6.QtWidgets import QAbstractItemView, QListView
+
+from ParkingLotAnnotTool.utils.imagewriter import default_num_workers
+from ..general.framecache import FrameCache
+from .scenedata import SceneData, read_lot_crop, render_lot_img
+from .thumbstore import LotThumbStore
+
+CELL_SIZE = 128
+# Requests beyond this are dropped oldest first; they belong to cells scrolled past.
+MAX_PENDING = 256
+# Cell pixmaps kept on the GUI thread; a full-screen grid shows about 100 cells.
+MAX_CELL_PIXMAPS = 1024
+
+
+@dataclass(frozen=True)
+class ThumbJob:
+    """What a loader thread needs for one cell, taken from SceneData on the GUI thread."""
+    thumb_store: Optional[LotThumbStore]
+    lot_id: str
+    quad: list
+    frame_idx: int
+    raw_frame_path: Path
+    lot_frame_path: Path
+
+
+class ThumbLoader(QObject):
+    """Load lot thumbnails into a FrameCache on a pool of threads.
+
+    The newest request is served first, so the cells just scrolled into view
+    appear before the ones scrolled past. loader(job) runs on the pool and
+    must only read job; loaded is emitted with the key of every image put in
+    the cache.
+    """
+    loaded = pyqtSignal(object)
+
+    def __init__(self, cache: FrameCache, loader, num_workers=None):
+        super().__init__()
+        self._cache = cache
+        self._loader = loader
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._is_stopped = False
+        num_workers = default_num_workers() if num_workers is None else max(1, num_workers)
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(num_workers)]
+        for thread in self._threads:
+            thread.start()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    def request(self, key: Hashable, job) -> None:
+        with self._condition:
+            self._pending[key] = job
+            self._pending.move_to_end(key)
+            while len(self._pending) > MAX_PENDING:
+                self._pending.popitem(last=False)
+            self._condition.notify()
+
+    def clear(self) -> None:
+        with self._condition:
+            self._pending.clear()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._is_stopped:
+                    self._condition.wait()
+                if self._is_stopped:
+                    return
+                key, job = self._pending.popitem(last=True)
+            if key in self._cache:
+                continue
+            try:
+                img = self._loader(job)
+            except Exception:
+                # Cells whose image cannot be loaded stay blank.
+                continue
+            if img is not None:
+                self._cache.put(key, img)
+                self.loaded.emit(key)
+
+    def stop(self):
+        with self._condition:
+            self._is_stopped = True
+            self._pending.clear()
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+
+class FilmstripModel(QAbstractListModel):
+    """One cell per frame showing the current lot; images are loaded when a cell is first shown."""
+
+    def __init__(self, scene_data: SceneData, parent=None):
+        super().__init__(parent)
+        self.scene_data = scene_data
+        self.scene_data.data_loaded.connect(self.on_data_loaded)
+        self.scene_data.selected_lot_idx_changed.connect(self.reset)
+        # Keys carry the load generation, so crops of a previously opened dataset are never shown.
+        self._generation = 0
+        self._cache = FrameCache(max_mbytes=128)
+        self._pixmaps = OrderedDict()
+        self._placeholder = QPixmap(CELL_SIZE, CELL_SIZE)
+        self._placeholder.fill(QColor("lightgray"))
+        self._loader = ThumbLoader(self._cache, self.load_thumb)
+        self._loader.loaded.connect(self.on_thumb_loaded)
+
+    def on_data_loaded(self):
+        self._generation += 1
+        self._cache.clear()
+        self.reset()
+
+    def reset(self):
+        self.beginResetModel()
+        self._loader.clear()
+        self._pixmaps.clear()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or (self.scene_data.current_lot_id() is None):
+            return 0
+        return self.scene_data.len_frames()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.scene_data.frame_at(index.row())
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self.cell_pixmap(index.row())
+        return None
+
+    def cell_pixmap(self, row: int) -> QPixmap:
+        key = (self._generation, self.scene_data.current_lot_id(), row)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            return pixmap
+        img = self._cache.get(key)
+        if img is None:
+            self._loader.request(key, self.thumb_job(row))
+            return self._placeholder
+        qimg = QImage(img.data, img.shape[1], img.shape[0], img.strides[0], QImage.Format.Format_BGR888)
+        pixmap = QPixmap.fromImage(qimg)
+        self._pixmaps[key] = pixmap
+        while len(self._pixmaps) > MAX_CELL_PIXMAPS:
+            self._pixmaps.popitem(last=False)
+        return pixmap
+
+    def thumb_job(self, row: int) -> ThumbJob:
+        lot = self.scene_data.current_lot()
+        frame = self.scene_data.frame_at(row)
+        return ThumbJob(
+            thumb_store=self.scene_data.thumb_store(),
+            lot_id=lot['id'],
+            quad=lot['quad'],
+            frame_idx=row,
+            raw_frame_path=self.scene_data.raw_data_dir() / (frame + ".jpg"),
+            lot_frame_path=self.scene_data.lot_frame_path(lot['id'], frame))
+
+    @staticmethod
+    def load_thumb(job: ThumbJob) -> Optional[np.ndarray]:
+        # Runs on the loader threads: the thumb store first, then the crops
+        # written by ImageCropWorker, then a crop of the raw frame.
+        img = None
+        if job.thumb_store is not None:
+            img = job.thumb_store.get(job.lot_id, job.frame_idx)
+        if img is None:
+            img = read_lot_crop(job.lot_frame_path)
+        if (img is None) and job.raw_frame_path.exists():
+            img = render_lot_img(job.raw_frame_path, job.quad)
+        if img is None:
+            return None
+        return cv2.resize(img, (CELL_SIZE, CELL_SIZE), interpolation=cv2.INTER_AREA)
+
+    def on_thumb_loaded(self, key):
+        generation, lot_id, frame_idx = key
+        if (generation != self._generation) or (lot_id != self.scene_data.current_lot_id()) or (frame_idx >= self.rowCount()):
+            return
+        index = self.index(frame_idx)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class FilmstripView(QListView):
+    """Grid of the current lot across time. Clicking a cell emits frame_clicked with its frame index."""
+    frame_clicked = pyqtSignal(int)
+
+    def __init__(self, scene_data: SceneData, parent=None):
+        super().__init__(parent)
+        self.scene_data = scene_data
+        self.scene_data.current_frame_changed.connect(self.follow_current_frame)
+        self.setModel(FilmstripModel(scene_data, self))
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setMovement(QListView.Movement.Static)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setUniformItemSizes(True)
+        self.setIconSize(QSize(CELL_SIZE, CELL_SIZE))
+        self.setGridSize(QSize(CELL_SIZE + 8, CELL_SIZE + 24))
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.clicked.connect(lambda index: self.frame_clicked.emit(index.row()))
+
+    def follow_current_frame(self):
+        if not self.isVisible():
+            return
+        row = self.scene_data.frame_index(self.scene_data.current_frame())
+        if not (0 <= row < self.model().rowCount()):
+            return
+        index = self.model().index(row)
+        self.setCurrentIndex(index)
+        self.scrollTo(index)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.follow_current_frame()
@@ -1,14 +1,99 @@
+import bisect
 import cv2
 import numpy as np
 import json
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import FrozenSet, List, Optional, Tuple
 from PyQt6.QtCore import QObject, pyqtSignal, Qt
 from PyQt6.QtWidgets import *
 from PyQt6.QtWidgets import QMessageBox as QMB
 from ..general.dict_to_layout import dict_to_layout
+from ..general.framecache import FrameCache, FramePrefetcher
+from ..general.framecatalog import CATALOG_NAME, FrameCatalog, frame_sort_key
+from ..definequad.imgcrop import CROP_UP_SAMPLE_RATE
+from .changepoint import ChangePointWorker, quad_mask, reduce_frames
+from .thumbstore import MAX_STORE_MBYTES, THUMB_UP_SAMPLE_RATE, LotThumbStore, ThumbStoreBuildWorker, store_nbytes
 from PIL import Image, ImageDraw
 
+# Frames prefetched ahead of the current one in the scrub direction.
+PREFETCH_FRAMES = 8
+
+
+def render_lot_img(raw_frame_path: Path, quad: list) -> np.ndarray:
+    """Crop of the lot quad from a raw frame at 256x256, with the quad drawn."""
+    up_sample_rate = 2.0
+    image = Image.open(raw_frame_path)
+    contours = [(quad[0], quad[1]), (quad[2], quad[3]), (quad[4], quad[5]), (quad[6], quad[7])]
+    orig_xmin = min(contours, key=lambda item: item[0])[0]
+    orig_xmax = max(contours, key=lambda item: item[0])[0]
+    orig_ymin = min(contours, key=lambda item: item[1])[1]
+    orig_ymax = max(contours, key=lambda item: item[1])[1]
+    w = orig_xmax - orig_xmin
+    h = orig_ymax - orig_ymin
+    long_side = max(w, h)
+    crop_w = (long_side * up_sample_rate)
+    crop_h = crop_w
+    xmin = int(orig_xmin) - (crop_w - w) // 2
+    ymin = int(orig_ymin) - (crop_h - h) // 2
+    xmax = xmin + crop_w
+    ymax = ymin + crop_h
+    cropped_img = image.crop((xmin, ymin, xmax, ymax))
+    offseted_contours = [(p[0] - xmin, p[1] - ymin) for p in contours]
+    scale = 256 / cropped_img.size[0]
+    resized_contours = [(p[0] * scale, p[1] * scale) for p in offseted_contours]
+    dst = cropped_img.resize((256, 256))
+    draw = ImageDraw.Draw(dst)
+    draw.polygon(resized_contours, outline="red", width=5)
+    image_np = np.array(dst)
+    return cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+
+
+def read_lot_crop(lot_frame_path: Path) -> Optional[np.ndarray]:
+    # Crop written by ImageCropWorker/VideoCropWorker, used when raw frames were not kept.
+    image = cv2.imread(str(lot_frame_path))
+    if image is None:
+        return None
+    return cv2.resize(image, (256, 256))
+
+
+@dataclass(frozen=True)
+class SceneFrameState:
+    """Everything the widgets show about one frame of one lot."""
+    lot_id: Optional[str]
+    frame: str
+    prev_scene: Optional[dict]
+    next_scene: Optional[dict]
+    label: Optional[str]
+    prev_flags: Tuple[str, ...]
+    num_scenes: int
+    num_occluded_scenes: int
+    difficult_labels: FrozenSet[str]
+
+    @property
+    def prev_scene_frame(self):
+        return None if self.prev_scene is None else self.prev_scene["frame"]
+
+    @property
+    def next_scene_frame(self):
+        return None if self.next_scene is None else self.next_scene["frame"]
+
+    @property
+    def next_scene_label(self):
+        return None if self.next_scene is None else self.next_scene["label"]
+
+    @property
+    def is_occluded(self):
+        return "occluded" in self.prev_flags
+
+    @property
+    def is_ambiguous(self):
+        return "ambiguous" in self.difficult_labels
+
+    @property
+    def person_exists(self):
+        return "person" in self.difficult_labels
+
 
 class SceneData(QObject):
 
@@ -18,6 +103,8 @@ class SceneData(QObject):
     selected_difficult_frame_idx_changed = pyqtSignal()
     data_loaded = pyqtSignal()
     data_changed = pyqtSignal()
+    proposals_changed = pyqtSignal()
+    error = pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
@@ -25,6 +112,8 @@ class SceneData(QObject):
         self._video_path: str = None
         self._lots: Optional[list] = []
         self._scenes = {}
+        self._scene_keys = {}
+        self._difficult_frames = {}
         self._dirty: bool = False
         self._loaded: bool = False
 
@@ -33,39 +122,225 @@ class SceneData(QObject):
         self._selected_scene_idx = None
         self._selected_difficult_frame_idx = None
 
+        self._catalog = FrameCatalog(CATALOG_NAME)
+        self._scrub_direction = 1
+        self._lots_by_id = {}
+        self._frame_cache = FrameCache(max_mbytes=256)
+        self._prefetcher = FramePrefetcher(self._frame_cache, self.load_lot_img)
+        self._prefetcher.failed.connect(self.on_prefetch_failed)
+        self._thumb_store = None
+        self._thumb_store_worker = None
+
+        # Bumped on every edit; frame states and lot summaries are cached per version.
+        self._data_version = 0
+        self._frame_state = None
+        self._frame_state_key = None
+        self._lot_summaries = {}
+
+        # Proposed scene changes per lot, not saved; see propose_change_points().
+        self._proposals = {}
+        self._proposals_version = 0
+        self._change_point_worker = None
+        # Workers still running, canceled ones included, kept until their thread ends.
+        self._change_point_workers = []
+
     def reset(self):
         pass
 
     def load(self) -> bool:
         self.may_save()
+        # An in-flight prefetch would put a frame of the previous dataset into the cleared cache.
+        self._prefetcher.drop_pending()
         with open(self._json_path, 'r', encoding='utf-8') as file:
             data = json.load(file)
         self._video_path = data['video_path']
         self._lots = data['lots']
         self._scenes = data['scenes']
         self._difficult_frames = data['difficult_frames']
+        self.build_scene_index()
+        self.bump_data_version()
         self._dirty = False
         self._loaded = True
+        self._lots_by_id = {lot['id']: lot for lot in self._lots}
+        self._frame_cache.clear()
+        self._catalog = FrameCatalog(self.parent_dir() / CATALOG_NAME)
+        self._catalog.load(self.frames_dir())
+        self.open_thumb_store()
+        self.stop_change_point_worker()
+        self._proposals = {}
+        self._proposals_version += 1
 
         self._selected_scene_idx = None
         self._selected_difficult_frame_idx = None
         self.set_selected_lot_idx(0)
-        self.update_current_frame("00000")
+        self.update_current_frame(self._catalog.frame_at(0))
         self.data_loaded.emit()
         return True
 
+    def open_thumb_store(self):
+        # The worker closes the files of the previous store before it stops.
+        if self._thumb_store_worker is not None:
+            self._thumb_store_worker.stop()
+            self._thumb_store_worker = None
+        self._thumb_store = None
+        if (not self.raw_data_dir().exists()) or (self.len_frames() == 0) or (not self._lots):
+            return
+        thumb_store = LotThumbStore(self.thumbs_dir(), self._lots, self.frame_names())
+        nbytes = store_nbytes(len(self._lots), self.len_frames())
+        if (nbytes > MAX_STORE_MBYTES * 1024 * 1024) and (not thumb_store.exists()):
+            msg = (f'Lot thumbnails of this dataset take about {nbytes / 1024 ** 3:.1f} GB on disk. '
+                   'Build them? Without them lot images are rendered from the raw frames.')
+            ret = QMB.question(None, 'Attention', msg, QMB.StandardButton.Yes | QMB.StandardButton.No)
+            if ret != QMB.StandardButton.Yes:
+                return
+        # Opened, resumed and written in the worker; get() sees frames as they are built.
+        self._thumb_store = thumb_store
+        self._thumb_store_worker = ThumbStoreBuildWorker(thumb_store, self.raw_data_dir())
+        self._thumb_store_worker.error.connect(self.error)
+        self._thumb_store_worker.start()
+
+    def thumb_store(self) -> Optional[LotThumbStore]:
+        return self._thumb_store
+
+    def propose_change_points(self) -> bool:
+        """Analyse the crops of the current lot in the background and propose the frames where it changes."""
+        lot = self.current_lot()
+        if (not self._loaded) or (lot is None):
+            return False
+        lot_id = lot['id']
+        num_frames = self.len_frames()
+        if (self._thumb_store is not None) and self._thumb_store.is_complete():
+            thumb_store = self._thumb_store
+            load_chunk = lambda start, stop: reduce_frames(
+                [thumb_store.get(lot_id, i, cv2.IMREAD_REDUCED_COLOR_2) for i in range(start, stop)])
+            mask = quad_mask(lot['quad'], THUMB_UP_SAMPLE_RATE)
+        elif (self.parent_dir() / lot_id).exists():
+            lot_dir = self.parent_dir() / lot_id
+            frame_names = self.frame_names()
+            load_chunk = lambda start, stop: reduce_frames(
+                [cv2.imread(str(lot_dir / frame_names[i])) for i in range(start, stop)])
+            mask = quad_mask(lot['quad'], CROP_UP_SAMPLE_RATE)
+        else:
+            # Raw frames only: the thumb store is still being built.
+            return False
+        self.stop_change_point_worker()
+        worker = ChangePointWorker(load_chunk, num_frames, mask)
+        worker.finished.connect(lambda: self.on_change_point_worker_finished(worker, lot_id))
+        worker.canceled.connect(lambda: self.on_change_point_worker_ended(worker))
+        worker.error.connect(lambda message: self.on_change_point_worker_error(worker, message))
+        self._change_point_worker = worker
+        self._change_point_workers.append(worker)
+        worker.start()
+        return True
+
+    def stop_change_point_worker(self):
+        # Not waited for: the worker ends after its current chunk and its result is dropped.
+        if self._change_point_worker is not None:
+            self._change_point_worker.cancel()
+            self._change_point_worker = None
+
+    def on_change_point_worker_ended(self, worker: ChangePointWorker):
+        # run() has returned; wait() only lets the thread exit before the worker is released.
+        worker.wait()
+        self._change_point_workers.remove(worker)
+        if worker is self._change_point_worker:
+            self._change_point_worker = None
+
+    def on_change_point_worker_finished(self, worker: ChangePointWorker, lot_id):
+        # Results of a worker replaced by a later run or a reload arrive late and are dropped.
+        is_current = worker is self._change_point_worker
+        self.on_change_point_worker_ended(worker)
+        if is_current:
+            self.set_proposals(lot_id, [self.frame_at(i) for i in worker.proposals])
+
+    def on_change_point_worker_error(self, worker: ChangePointWorker, message: str):
+        if worker is self._change_point_worker:
+            self.error.emit(f"change point analysis: {message}")
+
+    def set_proposals(self, lot_id, frames: List[str]):
+        self._proposals[lot_id] = sorted(frames, key=frame_sort_key)
+        self._proposals_version += 1
+        self.proposals_changed.emit()
+
+    def proposals_version(self):
+        return self._proposals_version
+
+    def proposals_with_current_lot_id(self) -> List[str]:
+        return self._proposals.get(self.current_lot_id(), [])
+
+    def next_proposal_frame(self) -> Optional[str]:
+        proposals = self.proposals_with_current_lot_id()
+        i = bisect.bisect_right([frame_sort_key(frame) for frame in proposals], frame_sort_key(self._current_frame))
+        if i < len(proposals):
+            return proposals[i]
+        return None
+
+    def accept_proposal(self) -> bool:
+        """Turn the proposal at the current frame into a scene with the other label than the one before it."""
+        proposals = self.proposals_with_current_lot_id()
+        if self._current_frame not in proposals:
+            return False
+        if self.label_is_exist_in_frame(self._current_frame):
+            # add_scene() would not add a scene here.
+            return False
+        idx = self.frame_index(self._current_frame)
+        prev_label = self.label_at(self.frame_at(idx - 1)) if 0 < idx else None
+        if prev_label not in ("free", "busy"):
+            return False
+        proposals.remove(self._current_frame)
+        self._proposals_version += 1
+        self.proposals_changed.emit()
+        self.add_scene("busy" if prev_label == "free" else "free")
+        return True
+
     def current_frame(self):
         return self._current_frame
 
     def update_current_frame(self, value):
+        if value != self._current_frame:
+            self._scrub_direction = 1 if frame_sort_key(value) > frame_sort_key(self._current_frame) else -1
         self._current_frame = value
+        self.prefetch()
         self.current_frame_changed.emit()
 
+    def prefetch(self):
+        lot_id = self.current_lot_id()
+        if (not self._loaded) or (lot_id is None):
+            return
+        idx = self._catalog.nearest_index(self._current_frame)
+        keys = []
+        for i in range(1, PREFETCH_FRAMES + 1):
+            frame_idx = idx + self._scrub_direction * i
+            if 0 <= frame_idx < len(self._catalog):
+                keys.append((lot_id, self._catalog.frame_at(frame_idx)))
+        self._prefetcher.request(keys)
+
+    def on_prefetch_failed(self, key, message: str):
+        lot_id, frame = key
+        self.error.emit(f"prefetch of {lot_id}/{frame}: {message}")
+
+    def is_frame_ready(self, frame_idx: int) -> bool:
+        lot_id = self.current_lot_id()
+        if lot_id is None:
+            return True
+        if (self._thumb_store is not None) and self._thumb_store.has(lot_id, frame_idx):
+            return True
+        return (lot_id, self._catalog.frame_at(frame_idx)) in self._frame_cache
+
+    def prefetch_frames(self, frame_indices):
+        # Decode-ahead for playback; replaces the scrub prefetch of update_current_frame.
+        lot_id = self.current_lot_id()
+        if (not self._loaded) or (lot_id is None):
+            return
+        self._prefetcher.request([(lot_id, self._catalog.frame_at(frame_idx)) for frame_idx in frame_indices
+                                  if not self.is_frame_ready(frame_idx)])
+
     def selected_lot_idx(self):
         return self._selected_lot_idx
 
     def set_selected_lot_idx(self, value):
         self._selected_lot_idx = value
+        self.prefetch()
         self.selected_lot_idx_changed.emit()
 
     def current_lot_id(self):
@@ -79,34 +354,39 @@ class SceneData(QObject):
         return self.lots()[self._selected_lot_idx]
 
     def current_lot_img(self):
-        up_sample_rate = 2.0
         if self.current_lot() is None:
             return None
-        q = self.current_lot()['quad']
-        image = Image.open(self.raw_data_dir() / (self._current_frame + ".jpg"))
-        contours = [(q[0], q[1]), (q[2], q[3]), (q[4], q[5]), (q[6], q[7])]
-        orig_xmin = min(contours, key=lambda item: item[0])[0]
-        orig_xmax = max(contours, key=lambda item: item[0])[0]
-        orig_ymin = min(contours, key=lambda item: item[1])[1]
-        orig_ymax = max(contours, key=lambda item: item[1])[1]
-        w = orig_xmax - orig_xmin
-        h = orig_ymax - orig_ymin
-        long_side = max(w, h)
-        crop_w = (long_side * up_sample_rate)
-        crop_h = crop_w
-        xmin = int(orig_xmin) - (crop_w - w) // 2
-        ymin = int(orig_ymin) - (crop_h - h) // 2
-        xmax = xmin + crop_w
-        ymax = ymin + crop_h
-        cropped_img = image.crop((xmin, ymin, xmax, ymax))
-        offseted_contours = [(p[0] - xmin, p[1] - ymin) for p in contours]
-        scale = 256 / cropped_img.size[0]
-        resized_contours = [(p[0] * scale, p[1] * scale) for p in offseted_contours]
-        dst = cropped_img.resize((256, 256))
-        draw = ImageDraw.Draw(dst)
-        draw.polygon(resized_contours, outline="red", width=5)
-        image_np = np.array(dst)
-        return cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+        key = (self.current_lot_id(), self._current_frame)
+        img = self._frame_cache.get(key)
+        if img is None:
+            img = self.load_lot_img(key)
+            self._frame_cache.put(key, img)
+        return img
+
+    def load_lot_img(self, key):
+        # Called from the prefetch thread too, so it only reads data fixed at load().
+        lot_id, frame = key
+        thumb_store = self._thumb_store
+        if thumb_store is not None:
+            frame_idx = self._catalog.index_of(frame)
+            if frame_idx is not None:
+                img = thumb_store.get(lot_id, frame_idx)
+                if img is not None:
+                    return img
+        return self.render_lot_img(key)
+
+    def render_lot_img(self, key):
+        lot_id, frame = key
+        raw_frame_path = self.raw_data_dir() / (frame + ".jpg")
+        if not raw_frame_path.exists():
+            return self.lot_crop_img(lot_id, frame)
+        return render_lot_img(raw_frame_path, self._lots_by_id[lot_id]['quad'])
+
+    def lot_crop_img(self, lot_id, frame):
+        return read_lot_crop(self.lot_frame_path(lot_id, frame))
+
+    def lot_frame_path(self, lot_id, frame) -> Path:
+        return self.parent_dir() / lot_id / (frame + ".jpg")
 
     def selected_scene(self):
         return self.scenes_with_current_lot_id()[self._selected_scene_idx]
@@ -144,107 +424,144 @@ class SceneData(QObject):
             self.update_current_frame(difficult_frame["frame"])
         self.selected_difficult_frame_idx_changed.emit()
 
+    def build_scene_index(self):
+        # Scenes of every lot are kept sorted by frame number, with a parallel
+        # list of the frame_sort_key()s of their frames for bisect lookups.
+        self._scene_keys = {}
+        for lot_id, scenes in self._scenes.items():
+            scenes.sort(key=lambda x: frame_sort_key(x["frame"]))
+            self._scene_keys[lot_id] = [frame_sort_key(scene["frame"]) for scene in scenes]
+
+    def scene_keys_with_current_lot_id(self):
+        if self.current_lot_id() is None:
+            return None
+        return self._scene_keys.setdefault(self.current_lot_id(), [])
+
     def sort_scenes(self):
         scenes = self.scenes_with_current_lot_id()
         if scenes is not None:
-            scenes.sort(key=lambda x: x["frame"])
+            scenes.sort(key=lambda x: frame_sort_key(x["frame"]))
+            self._scene_keys[self.current_lot_id()] = [frame_sort_key(scene["frame"]) for scene in scenes]
 
     def sort_difficult_frames(self):
         difficult_frames = self.difficult_frames_with_current_lot_id()
         if difficult_frames is not None:
-            difficult_frames.sort(key=lambda x: x["frame"])
+            difficult_frames.sort(key=lambda x: frame_sort_key(x["frame"]))
+
+    def data_version(self):
+        return self._data_version
+
+    def bump_data_version(self):
+        self._data_version += 1
+        self._frame_state = None
+        self._lot_summaries = {}
+
+    def notify_data_changed(self):
+        self.bump_data_version()
+        self.data_changed.emit()
+
+    def lot_summary(self, lot_id):
+        # (num scenes, num occluded scenes, {frame: labels of its difficult frames})
+        summary = self._lot_summaries.get(lot_id)
+        if summary is None:
+            scenes = self._scenes.get(lot_id) or []
+            num_occluded = sum(1 for scene in scenes if "occluded" in scene["flags"])
+            difficult_labels = {}
+            for difficult_frame in self._difficult_frames.get(lot_id) or []:
+                difficult_labels.setdefault(difficult_frame["frame"], set()).add(difficult_frame["label"])
+            summary = (len(scenes), num_occluded,
+                       {frame: frozenset(labels) for frame, labels in difficult_labels.items()})
+            self._lot_summaries[lot_id] = summary
+        return summary
+
+    def frame_state(self) -> SceneFrameState:
+        """State of the current frame, computed once per (lot, frame, data version)."""
+        key = (self.current_lot_id(), self._current_frame, self._data_version)
+        if self._frame_state_key != key or self._frame_state is None:
+            self._frame_state = self.build_frame_state()
+            self._frame_state_key = key
+        return self._frame_state
+
+    def build_frame_state(self) -> SceneFrameState:
+        lot_id = self.current_lot_id()
+        prev_scene, next_scene = self.get_adjacent_scenes()
+        if lot_id is None:
+            num_scenes, num_occluded, difficult_labels = 0, 0, {}
+        else:
+            num_scenes, num_occluded, difficult_labels = self.lot_summary(lot_id)
+        return SceneFrameState(
+            lot_id=lot_id,
+            frame=self._current_frame,
+            prev_scene=prev_scene,
+            next_scene=next_scene,
+            label=None if prev_scene is None else prev_scene["label"],
+            prev_flags=() if prev_scene is None else tuple(prev_scene["flags"]),
+            num_scenes=num_scenes,
+            num_occluded_scenes=num_occluded,
+            difficult_labels=difficult_labels.get(self._current_frame, frozenset()))
 
     def current_scene(self):
         return self.prev_scene()
 
     def current_label(self):
-        if self.current_scene() is None:
-            return None
-        return self.current_scene()["label"]
+        return self.frame_state().label
 
-    def get_adjacent_scenes(self):
-        self.sort_scenes()
+    def get_adjacent_scenes(self, frame=None):
+        if frame is None:
+            frame = self._current_frame
         scenes = self.scenes_with_current_lot_id()
         if not scenes:
             return None, None
-
-        prev_scene, next_scene = None, None
-        for i in range(len(scenes)):
-            frame = scenes[i]["frame"]
-            if self._current_frame >= frame:
-                prev_scene = scenes[i]
-            if self._current_frame < frame:
-                if (next_scene is not None) and (frame > next_scene["frame"]):
-                    break
-                next_scene = scenes[i]
+        i = bisect.bisect_right(self.scene_keys_with_current_lot_id(), frame_sort_key(frame))
+        prev_scene = scenes[i - 1] if i > 0 else None
+        next_scene = scenes[i] if i < len(scenes) else None
         return prev_scene, next_scene
 
+    def label_at(self, frame):
+        prev_scene, _ = self.get_adjacent_scenes(frame)
+        if prev_scene is None:
+            return None
+        return prev_scene["label"]
+
     def next_scene(self):
-        prev_scene, next_scene = self.get_adjacent_scenes()
-        return next_scene
+        return self.frame_state().next_scene
 
     def prev_scene(self):
-        prev_scene, next_scene = self.get_adjacent_scenes()
-        return prev_scene
+        return self.frame_state().prev_scene
 
     def next_scene_frame(self):
-        if self.next_scene() is None:
-            return None
-        return self.next_scene()["frame"]
+        return self.frame_state().next_scene_frame
 
     def prev_scene_frame(self):
-        if self.prev_scene() is None:
-            return None
-        return self.prev_scene()["frame"]
+        return self.frame_state().prev_scene_frame
 
     def next_scene_label(self):
-        if self.next_scene() is None:
-            return None
-        return self.next_scene()["label"]
+        return self.frame_state().next_scene_label
 
     def prev_scene_label(self):
-        if self.prev_scene() is None:
-            return None
-        return self.prev_scene()["label"]
+        return self.frame_state().label
 
     def num_scenes(self):
-        scenes = self.scenes_with_current_lot_id()
-        if scenes is None:
-            return 0
-        return len(scenes)
+        return self.frame_state().num_scenes
 
     def num_occluded_scenes(self):
-        scenes = self.scenes_with_current_lot_id()
-        if scenes is None:
-            return 0
-        size = 0
-        for scene in scenes:
-            if "occluded" in scene["flags"]:
-                size += 1
-        return size
+        return self.frame_state().num_occluded_scenes
 
     def is_ambiguous(self):
-        for difficult_frame in self.difficult_frames_with_current_lot_id():
-            if (difficult_frame["frame"] == self.current_frame()) and (
-                difficult_frame["label"] == "ambiguous"):
-                return True
-        return False
+        return self.frame_state().is_ambiguous
 
     def person_exists(self):
-        for difficult_frame in self.difficult_frames_with_current_lot_id():
-            if (difficult_frame["frame"] == self.current_frame()) and (
-                difficult_frame["label"] == "person"):
-                return True
-        return False
+        return self.frame_state().person_exists
 
     def info(self):
+        state = self.frame_state()
         return {
-            "frame": self.current_frame(),
-            "label": self.current_label(),
-            "num scenes": self.num_scenes(),
-            "num occluded\nscenes": self.num_occluded_scenes(),
-            "is ambiguous": self.is_ambiguous(),
-            "person exists": self.person_exists()}
+            "frame": state.frame,
+            "label": state.label,
+            "num scenes": state.num_scenes,
+            "num occluded\nscenes": state.num_occluded_scenes,
+            "is ambiguous": state.is_ambiguous,
+            "person exists": state.person_exists}
 
     def parent_dir(self) -> Path:
         return self._json_path.parent
@@ -252,17 +569,42 @@ class SceneData(QObject):
     def raw_data_dir(self) -> Path:
         return self.parent_dir() / "raw"
 
+    def thumbs_dir(self) -> Path:
+        return self.parent_dir() / "thumbs"
+
+    def preview_data_dir(self) -> Path:
+        return self.parent_dir() / "preview"
+
+    def frames_dir(self) -> Path:
+        # Without raw frames (fused extract-and-crop), frames are listed from the previews or lot crops.
+        if self.raw_data_dir().exists():
+            return self.raw_data_dir()
+        if self.preview_data_dir().exists():
+            return self.preview_data_dir()
+        if self._lots:
+            return self.lot_dirs()[0]
+        return self.raw_data_dir()
+
     def lot_dirs(self) -> Path:
         return [self.parent_dir() / lot['id'] for lot in self._lots]
 
     def lot_ids(self):
         return [lot['id'] for lot in self._lots]
 
+    def frame_catalog(self) -> FrameCatalog:
+        return self._catalog
+
     def len_frames(self):
-        return len(list(self.raw_data_dir().glob("*.jpg")))
+        return len(self._catalog)
 
     def frame_names(self):
-        return [f'{i:05d}.jpg' for i in range(self.len_frames())]
+        return self._catalog.file_names()
+
+    def frame_at(self, idx: int) -> str:
+        return self._catalog.frame_at(idx)
+
+    def frame_index(self, frame: str) -> int:
+        return self._catalog.nearest_index(frame)
 
     def lots(self):
         return self._lots
@@ -271,40 +613,43 @@ class SceneData(QObject):
         return self._scenes
 
     def label_is_exist_in_frame(self, frame):
-        scenes = self.scenes_with_current_lot_id()
-        for scene in scenes:
-            if scene["frame"] == frame:
-                return True
-        return False
+        keys = self.scene_keys_with_current_lot_id()
+        key = frame_sort_key(frame)
+        i = bisect.bisect_left(keys, key)
+        return (i < len(keys)) and (keys[i] == key)
 
     def add_scene(self, label):
         if self.label_is_exist_in_frame(self._current_frame):
             return
-        self.scenes_with_current_lot_id().append(
+        keys = self.scene_keys_with_current_lot_id()
+        key = frame_sort_key(self._current_frame)
+        i = bisect.bisect_right(keys, key)
+        self.scenes_with_current_lot_id().insert(
+            i,
             {
                 "label": label,
                 "frame": self._current_frame,
                 "flags": []})
-        self.sort_scenes()
-        self.data_changed.emit()
+        keys.insert(i, key)
+        self.notify_data_changed()
 
     def add_occluded_flag(self):
         if self.prev_scene() is None:
             return
         self.prev_scene()["flags"].append("occluded")
-        self.data_changed.emit()
+        self.notify_data_changed()
 
     def add_person_frame(self):
         self.difficult_frames_with_current_lot_id().append(
             {"label": "person",
              "frame": self._current_frame})
-        self.data_changed.emit()
+        self.notify_data_changed()
 
     def add_ambiguous_frame(self):
         self.difficult_frames_with_current_lot_id().append(
             {"label": "ambiguous",
              "frame": self._current_frame})
-        self.data_changed.emit()
+        self.notify_data_changed()
 
     def remove_selected_scene(self):
         scenes = self.scenes_with_current_lot_id()
@@ -313,7 +658,8 @@ class SceneData(QObject):
         if self._selected_scene_idx is None:
             return
         scenes.pop(self._selected_scene_idx)
-        self.data_changed.emit()
+        self.scene_keys_with_current_lot_id().pop(self._selected_scene_idx)
+        self.notify_data_changed()
 
     def remove_difficult_frame(self):
         difficult_frames = self.difficult_frames_with_current_lot_id()
@@ -322,7 +668,7 @@ class SceneData(QObject):
         if self._selected_difficult_frame_idx is None:
             return
         difficult_frames.pop(self._selected_difficult_frame_idx)
-        self.data_changed.emit()
+        self.notify_data_changed()
 
     def loaded(self) -> bool:
         return self._loaded
@@ -2,6 +2,8 @@ from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 from PyQt6.QtWidgets import *
 
+from ParkingLotAnnotTool.core.general.playback import SPEEDS, PlaybackController
+
 from ParkingLotAnnotTool.public.hotkey import global_hotkey
 from .scenedata import SceneData
 
@@ -14,6 +16,7 @@ class SeekBarWidget(QWidget):
         self.scene_data = scene_data
         self.scene_data.selected_lot_idx_changed.connect(self.repaint)
         self.scene_data.data_changed.connect(self.repaint)
+        self.scene_data.proposals_changed.connect(self.update)
         self.scene_data.selected_scene_idx_changed.connect(self.update_value)
         self.slider = QSlider(Qt.Orientation.Horizontal)
         self.slider.setMinimum(0)
@@ -33,13 +36,32 @@ class SeekBarWidget(QWidget):
         self.timer.setInterval(100)  # msec
         self.timer.timeout.connect(self.update_index)
 
+        self.play_button = QPushButton("Play")
+        self.play_button.setCheckable(True)
+        self.play_button.toggled.connect(self.toggle_playback)
+        self.speed_combo = QComboBox()
+        for speed in SPEEDS:
+            self.speed_combo.addItem(f"{speed}x", speed)
+        self.speed_combo.currentIndexChanged.connect(self.change_speed)
+
+        self.playback = PlaybackController(self)
+        self.playback.frame_requested.connect(self.slider.setValue)
+        self.playback.playing_changed.connect(self.play_button.setChecked)
+        self.slider.sliderPressed.connect(self.playback.stop)
+        self.playback.set_source(self.scene_data.is_frame_ready, self.scene_data.prefetch_frames)
+
         self.increment = 0
         self.long_press_detected = False
 
+        self._marker_key = None
+        self._marker_pixmap = None
+
         layout = QHBoxLayout()
         layout.addWidget(self.prev_button)
         layout.addWidget(self.slider)
         layout.addWidget(self.next_button)
+        layout.addWidget(self.play_button)
+        layout.addWidget(self.speed_combo)
 
         self.setLayout(layout)
 
@@ -51,12 +73,25 @@ class SeekBarWidget(QWidget):
         value = self.slider.value()
         self.slider.setValue(min(value + 1, self.slider.maximum()))
 
+    def toggle_playback(self, checked):
+        if not checked:
+            self.playback.stop()
+            return
+        self.playback.play(self.slider.value(), self.slider.maximum())
+        if not self.playback.is_playing():
+            self.play_button.setChecked(False)
+
+    def change_speed(self, index):
+        self.playback.set_speed(self.speed_combo.itemData(index))
+
     def start_next_timer(self):
+        self.playback.stop()
         self.increment = 1
         self.long_press_detected = False
         self.timer.start()
 
     def start_prev_timer(self):
+        self.playback.stop()
         self.increment = -1
         self.long_press_detected = False
         self.timer.start()
@@ -73,7 +108,7 @@ class SeekBarWidget(QWidget):
         self.slider.setValue(max(value + self.increment, self.slider.minimum()))
 
     def value_changed(self, value):
-        self.scene_data.update_current_frame(f"{value:05d}")
+        self.scene_data.update_current_frame(self.scene_data.frame_at(value))
 
     def set_maxvalue(self, value):
         self.slider.setMaximum(value)
@@ -82,13 +117,13 @@ class SeekBarWidget(QWidget):
         return self.slider.value()
 
     def get_value_str(self):
-        return f"{self.slider.value():05d}"
+        return self.scene_data.frame_at(self.slider.value())
 
     def set_value(self, value):
         self.slider.setValue(value)
 
     def update_value(self):
-        self.slider.setValue(int(self.scene_data.current_frame()))
+        self.slider.setValue(self.scene_data.frame_index(self.scene_data.current_frame()))
 
     def hotkey_handler(self, qtkey):
         if   qtkey == Qt.Key.Key_H:
@@ -103,13 +138,33 @@ class SeekBarWidget(QWidget):
             return
 
         painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.marker_pixmap())
+
+    def marker_pixmap(self) -> QPixmap:
+        # Markers only move when the scenes, the lot or the geometry change;
+        # slider moves and hovering just blit the cached track.
+        key = (self.scene_data.current_lot_id(), self.scene_data.data_version(), self.scene_data.proposals_version(),
+               self.size(), self.slider.geometry(), self.slider.minimum(), self.slider.maximum())
+        if key != self._marker_key:
+            self._marker_pixmap = self.render_markers()
+            self._marker_key = key
+        return self._marker_pixmap
+
+    def render_markers(self) -> QPixmap:
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(self.size() * dpr)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(pixmap)
         slider_rect = self.slider.geometry()
         slider_min = self.slider.minimum()
-        slider_max = self.slider.maximum()
+        slider_span = max(self.slider.maximum() - slider_min, 1)
         pen_free = QPen(QColor("green"), 2)
         pen_busy = QPen(QColor("red"), 2)
         pen_flags = QPen(QColor("blue"), 2)
         pen_difficult = QPen(QColor("orange"), 2)
+        pen_proposal = QPen(QColor("magenta"), 1, Qt.PenStyle.DashLine)
 
         line_length = slider_rect.bottom() - slider_rect.top()
         center = slider_rect.top() + int(line_length / 2)
@@ -119,7 +174,7 @@ class SeekBarWidget(QWidget):
                 painter.setPen(pen_free)
             if scene["label"] == 'busy':
                 painter.setPen(pen_busy)
-            marker = slider_rect.left() + slider_rect.width() * (int(scene["frame"]) - slider_min) / (slider_max - slider_min)
+            marker = slider_rect.left() + slider_rect.width() * (self.scene_data.frame_index(scene["frame"]) - slider_min) / slider_span
             marker = int(marker)
             painter.drawLine(marker, center - line_length, marker, center)
 
@@ -129,8 +184,17 @@ class SeekBarWidget(QWidget):
             painter.setPen(pen_flags)
             painter.drawLine(marker, center, marker, center + line_length)
 
+        painter.setPen(pen_difficult)
         for difficult_frames in self.scene_data.difficult_frames_with_current_lot_id():
-            marker = slider_rect.left() + slider_rect.width() * (int(difficult_frames["frame"]) - slider_min) / (slider_max - slider_min)
+            marker = slider_rect.left() + slider_rect.width() * (self.scene_data.frame_index(difficult_frames["frame"]) - slider_min) / slider_span
             marker = int(marker)
-            painter.setPen(pen_difficult)
             painter.drawLine(marker, center, marker, center + line_length)
+
+        # Proposed scene changes are tentative until accepted.
+        painter.setPen(pen_proposal)
+        for frame in self.scene_data.proposals_with_current_lot_id():
+            marker = slider_rect.left() + slider_rect.width() * (self.scene_data.frame_index(frame) - slider_min) / slider_span
+            marker = int(marker)
+            painter.drawLine(marker, center - line_length, marker, center + line_length)
+        painter.end()
+        return pixmap
@@ -0,0 +1,243 @@
+import cv2
+import hashlib
+import json
+import os
+import numpy as np
+from pathlib import Path
+from typing import List, Optional
+from PyQt6.QtCore import QCoreApplication, QThread, pyqtSignal
+
+from ..definequad.imgcrop import LotCropper
+
+THUMB_SIZE = 256
+THUMB_UP_SAMPLE_RATE = 2.0
+THUMB_JPEG_QUALITY = 90
+THUMB_EXT = ".jpgs"
+# A 256 px lot crop takes about 16 KiB as JPEG, against 192 KiB uncompressed.
+THUMB_NBYTES = 16 * 1024
+# Frames written between two saves of the index.
+INDEX_SAVE_INTERVAL = 32
+# Stores estimated larger than this are only built if the user agrees.
+MAX_STORE_MBYTES = 8192
+
+
+def store_nbytes(num_lots: int, num_frames: int) -> int:
+    """Estimated disk size of a store."""
+    return num_lots * num_frames * THUMB_NBYTES
+
+
+class LotThumbStore:
+    """Lot crops as shown by Classify Scene, JPEG-encoded, one file per lot.
+
+    thumbs/<lot_id>.jpgs holds the crops of a lot back to back in frame order
+    and thumbs/offsets.npy the (num_lots, num_frames + 1) byte offsets of
+    them. thumbs/index.json records how many leading frames are valid and the
+    lots/frames the store was built for.
+
+    Only ThumbStoreBuildWorker opens and writes the store. get() can be called
+    from any thread; it reads with its own short-lived file handle, so nothing
+    stays open or mapped once the worker is done.
+    """
+
+    def __init__(self, store_dir: Path, lots: list, frame_names: List[str]):
+        self._dir = Path(store_dir)
+        self._lots = lots
+        self._frame_names = frame_names
+        self._lot_indices = {lot['id']: i for i, lot in enumerate(lots)}
+        self._offsets = np.zeros((len(lots), len(frame_names) + 1), dtype=np.int64)
+        self._files = []
+        self._built = 0
+
+    def index_path(self) -> Path:
+        return self._dir / "index.json"
+
+    def offsets_path(self) -> Path:
+        return self._dir / "offsets.npy"
+
+    def data_path(self, lot_id: str) -> Path:
+        return self._dir / f"{lot_id}{THUMB_EXT}"
+
+    def signature(self) -> str:
+        sha1 = hashlib.sha1()
+        sha1.update(json.dumps([[lot['id'], lot['quad']] for lot in self._lots]).encode())
+        sha1.update(json.dumps(self._frame_names).encode())
+        return sha1.hexdigest()
+
+    def read_index(self) -> Optional[dict]:
+        """index.json if the store on disk was built for these lots/frames."""
+        try:
+            with open(self.index_path(), 'r', encoding='utf-8') as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if index.get("signature") != self.signature():
+            return None
+        return index
+
+    def exists(self) -> bool:
+        return self.read_index() is not None
+
+    def open(self) -> None:
+        """Resume the store on disk, or start it over if it was built for other lots/frames."""
+        self._built = 0
+        os.makedirs(self._dir, exist_ok=True)
+        index = self.read_index()
+        built = 0
+        if index is not None:
+            try:
+                offsets = np.load(self.offsets_path())
+                if offsets.shape == self._offsets.shape:
+                    built = index["built"]
+                    self._offsets[:] = offsets
+            except (OSError, ValueError):
+                pass
+        for i, lot in enumerate(self._lots):
+            path = self.data_path(lot['id'])
+            size = path.stat().st_size if path.exists() else 0
+            if size < self._offsets[i, built]:
+                built = 0
+        if built == 0:
+            self._offsets[:] = 0
+        self.remove_stale_files()
+        if built < len(self._frame_names):
+            # Bytes written after the last saved index are dropped.
+            for i, lot in enumerate(self._lots):
+                file = open(self.data_path(lot['id']), 'ab')
+                file.truncate(self._offsets[i, built])
+                self._files.append(file)
+        self._built = built
+
+    def remove_stale_files(self) -> None:
+        # Files of deleted lots and of older store formats.
+        keep = {self.index_path().name, self.offsets_path().name}
+        keep.update(self.data_path(lot['id']).name for lot in self._lots)
+        with os.scandir(self._dir) as entries:
+            stale = [entry.path for entry in entries if entry.is_file() and entry.name not in keep]
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                # Still open elsewhere (Windows); removed on a later open.
+                pass
+
+    def close(self) -> None:
+        for file in self._files:
+            file.close()
+        self._files = []
+
+    def save_index(self) -> None:
+        for file in self._files:
+            file.flush()
+        tmp_path = self.offsets_path().with_suffix('.tmp')
+        with open(tmp_path, 'wb') as file:
+            np.save(file, self._offsets)
+        os.replace(tmp_path, self.offsets_path())
+        index = {
+            "signature": self.signature(),
+            "size": THUMB_SIZE,
+            "frames": len(self._frame_names),
+            "built": self._built}
+        tmp_path = self.index_path().with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(index, file)
+        os.replace(tmp_path, self.index_path())
+
+    def lots(self) -> list:
+        return self._lots
+
+    def frame_names(self) -> List[str]:
+        return self._frame_names
+
+    def built(self) -> int:
+        return self._built
+
+    def is_complete(self) -> bool:
+        return self._built >= len(self._frame_names)
+
+    def has(self, lot_id: str, frame_idx: int) -> bool:
+        return (lot_id in self._lot_indices) and (0 <= frame_idx < self._built)
+
+    def get(self, lot_id: str, frame_idx: int, flags=cv2.IMREAD_COLOR) -> Optional[np.ndarray]:
+        if not self.has(lot_id, frame_idx):
+            return None
+        i = self._lot_indices[lot_id]
+        start, stop = self._offsets[i, frame_idx], self._offsets[i, frame_idx + 1]
+        try:
+            with open(self.data_path(lot_id), 'rb') as file:
+                file.seek(start)
+                buffer = file.read(stop - start)
+        except OSError:
+            return None
+        return cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), flags)
+
+    def put_frame(self, frame_idx: int, crops: List[np.ndarray]) -> None:
+        """Store the crops of frame_idx, which must be the first frame not built yet."""
+        params = [cv2.IMWRITE_JPEG_QUALITY, THUMB_JPEG_QUALITY]
+        for i, (file, crop) in enumerate(zip(self._files, crops)):
+            ok, buffer = cv2.imencode(".jpg", crop, params)
+            if not ok:
+                raise OSError(f"failed to encode the thumbnail of {self._lots[i]['id']}/{self._frame_names[frame_idx]}")
+            file.write(buffer.tobytes())
+            file.flush()
+            self._offsets[i, frame_idx + 1] = self._offsets[i, frame_idx] + len(buffer)
+        # Readers only see a frame once every lot of it is written.
+        self._built = frame_idx + 1
+        if (self._built % INDEX_SAVE_INTERVAL == 0) or self.is_complete():
+            self.save_index()
+
+
+class ThumbStoreBuildWorker(QThread):
+    progress = pyqtSignal(int)
+    finished = pyqtSignal()
+    canceled = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, store: LotThumbStore, raw_dir: Path):
+        super().__init__()
+        self.store = store
+        self.raw_dir = Path(raw_dir)
+        self._is_canceled = False
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    def run(self):
+        try:
+            self.store.open()
+            is_canceled = False
+            if not self.store.is_complete():
+                is_canceled = self.build()
+                self.store.save_index()
+        except OSError as e:
+            # A full disk or a read-only dataset: lot images keep being rendered from the raw frames.
+            self.store.close()
+            self.error.emit(f"thumbnails: {e}")
+            self.canceled.emit()
+            return
+        self.store.close()
+        if is_canceled:
+            self.canceled.emit()
+        else:
+            self.finished.emit()
+
+    def build(self) -> bool:
+        # Decode each raw frame once and crop every lot from it.
+        cropper = LotCropper(self.store.lots(), THUMB_SIZE, THUMB_SIZE, THUMB_UP_SAMPLE_RATE)
+        frame_names = self.store.frame_names()
+        total_frames = len(frame_names)
+        for frame_idx in range(self.store.built(), total_frames):
+            if self._is_canceled:
+                return True
+            frame = cv2.imread(str(self.raw_dir / frame_names[frame_idx]), cv2.IMREAD_COLOR)
+            if frame is None:
+                break
+            self.store.put_frame(frame_idx, cropper.crop_all(frame))
+            self.progress.emit(int((frame_idx / total_frames) * 100))
+        return False
+
+    def cancel(self):
+        self._is_canceled = True
+
+    def stop(self):
+        self.cancel()
+        self.wait()
@@ -1,6 +1,9 @@
 import cv2
 import json
+import os
+import numpy as np
 from pathlib import Path
+from typing import Optional
 
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
@@ -8,13 +11,14 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtWidgets import QDialogButtonBox as QDBB
 
 from ParkingLotAnnotTool.public.signals import global_signals
-from ParkingLotAnnotTool.utils.geometry import is_polygon_convex
+from ParkingLotAnnotTool.utils.geometry import quads_are_convex
 from ParkingLotAnnotTool.utils.resource import read_icon
 from ParkingLotAnnotTool.utils.trace import traceback_and_exit
 from ..general.canvas import CanvasPicture, CanvasScroll
 from ..general.action import new_action
 from .lotsdata import LotsData, LotsDataInfoWidget
 from .imgcrop import ImageCropWorker
+from .videocrop import VideoCropWorker
 from .videoextract import VideoExtractWorker
 
 epsilon = 16.0
@@ -45,6 +49,10 @@ class DefineQuadWidget(QWidget):
         self.canvas_picture.mouse_press_event_sig.connect(self.canvas.mouse_press_event)
         self.canvas_picture.mouse_release_event_sig.connect(self.canvas.mouse_release_event)
         self.canvas_picture.paint_event_sig.connect(self.canvas.paint_event)
+        self.canvas.update_request_sig.connect(self.canvas_picture.request_update)
+        self.lots_data.data_changed.connect(self.canvas_picture.request_update)
+        self.lots_data.selected_idx_changed.connect(self.canvas_picture.request_update)
+        self.lots_data.lot_changed.connect(self.canvas.request_lot_update)
         self.canvas_scroll = CanvasScroll(self, self.canvas_picture)
 
         self.open_action = new_action(self, 'Open', icon=read_icon('open_file.png'), slot=self.click_open)
@@ -146,7 +154,12 @@ class DefineQuadWidget(QWidget):
         self.videoextract_worker.progress.connect(self.progress_dialog.setValue)
         self.videoextract_worker.finished.connect(self.image_cropping_start)
         self.videoextract_worker.canceled.connect(self.progress_dialog.close)
-        if outdir_path.exists():
+        self.videoextract_worker.error.connect(self.print_worker_error)
+        if outdir_path.exists() and self.videoextract_worker.can_resume():
+            # Same video and parameters: extract only the frames that are missing.
+            global_signals.print(f"[{self.__class__.__name__}] resume extraction: {outdir_path}")
+            self.videoextract_worker.start()
+        elif outdir_path.exists():
             msg_box = QMessageBox()
             msg_box.setIcon(QMessageBox.Icon.Question)
             msg_box.setWindowTitle('Skip?')
@@ -161,8 +174,25 @@ class DefineQuadWidget(QWidget):
         else:
             self.videoextract_worker.start()
 
+    def video_cropping_start(self, video_path: Path, interval):
+        self.progress_dialog = QProgressDialog("Extracting and cropping frames...", "Cancel", 0, 100, self)
+        self.videocrop_worker = VideoCropWorker(video_path, self.scene_json_path, interval)
+
+        self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        self.progress_dialog.canceled.connect(self.videocrop_worker.cancel)
+        self.progress_dialog.show()
+        self.videocrop_worker.progress.connect(self.progress_dialog.setValue)
+        self.videocrop_worker.finished.connect(self.progress_dialog.close)
+        self.videocrop_worker.canceled.connect(self.progress_dialog.close)
+        self.videocrop_worker.error.connect(self.print_worker_error)
+        self.videocrop_worker.start()
+
+    def print_worker_error(self, message: str):
+        global_signals.print(f"[{self.__class__.__name__}] failed: {message}")
+
     def image_cropping_start(self):
-        self.imagecrop_worker = ImageCropWorker(self.scene_json_path)
+        jobs = max(1, (os.cpu_count() or 1) - 1)
+        self.imagecrop_worker = ImageCropWorker(self.scene_json_path, jobs=jobs)
 
         self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
         self.progress_dialog.canceled.connect(self.imagecrop_worker.cancel)
@@ -199,6 +229,13 @@ class DefineQuadWidget(QWidget):
         interval, ok = QInputDialog.getInt(self, "Extract Interval", "Enter the interval[sec]:", 60, 0, 100, 1)
         if not ok:
             return
+        ret = QMessageBox.question(
+            self, "Raw frames",
+            "Keep full-resolution raw frames?\n"
+            "'No' crops the lots directly from the video and writes only the lot images and downscaled previews.",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes)
+        keep_raw_frames = (ret == QMessageBox.StandardButton.Yes)
 
         self.scene_json_path = outdir_path / "scene.json"
         if self.scene_json_path.exists():
@@ -236,6 +273,9 @@ class DefineQuadWidget(QWidget):
         with open(conditions_json_path, 'w', encoding='utf-8') as file:
             json.dump(conditions_data, file, ensure_ascii=False, indent=4)
 
+        if not keep_raw_frames:
+            self.video_cropping_start(video_path, interval)
+            return
         raw_dir_path = outdir_path / "raw"
         self.video_extraction_start(video_path, raw_dir_path, interval)
 
@@ -298,11 +338,84 @@ class AddLotDialog(QDialog):
             pass
 
 
-class Canvas:
+def frame_interval_msec() -> int:
+    screen = QGuiApplication.primaryScreen()
+    rate = screen.refreshRate() if screen is not None else 0.0
+    return max(1, int(1000.0 / (rate if rate > 0 else 60.0)))
+
+
+class LotOverlay:
+    """Retained QPolygonF geometry of the lots, rebuilt only for lots whose revision changed."""
+
+    def __init__(self, lots_data: LotsData):
+        self.lots_data = lots_data
+        self._layout_revision = None
+        self._revisions = np.zeros(0, dtype=np.int64)
+        self._polygons = []
+        self._vertices = QPolygonF()
+        self._cropped = []
+        self._uncropped = []
+
+    def sync(self) -> None:
+        lots_data = self.lots_data
+        if self._layout_revision != lots_data.layout_revision():
+            changed = range(len(lots_data.lots()))
+            self._polygons = [None] * len(lots_data.lots())
+            self._vertices = QPolygonF([QPointF()] * (4 * len(lots_data.lots())))
+        else:
+            changed = np.flatnonzero(self._revisions != lots_data.revisions()).tolist()
+            if not changed:
+                return
+        quads = lots_data.quads()
+        for lidx in changed:
+            points = [QPointF(x, y) for x, y in quads[lidx].tolist()]
+            self._polygons[lidx] = QPolygonF(points)
+            for pidx, point in enumerate(points):
+                self._vertices.replace(4 * lidx + pidx, point)
+        lots = lots_data.lots()
+        self._cropped = [lidx for lidx, lot in enumerate(lots) if lot['crop']]
+        self._uncropped = [lidx for lidx, lot in enumerate(lots) if not lot['crop']]
+        self._layout_revision = lots_data.layout_revision()
+        self._revisions = lots_data.revisions().copy()
+
+    def draw(self, p: QPainter, scale: float, selected_lidx, highlighted_lidx, highlighted_pidx) -> None:
+        self.sync()
+        p.setPen(QPen(QColor(0, 0, 0, 0)))
+        for lidxs, color in ((self._uncropped, lot_default_fill_color),
+                             (self._cropped, lot_cropped_fill_color)):
+            p.setBrush(QBrush(color))
+            for lidx in lidxs:
+                if (lidx != selected_lidx) and (lidx != highlighted_lidx):
+                    p.drawPolygon(self._polygons[lidx])
+        if (highlighted_lidx is not None) and (highlighted_lidx != selected_lidx) and \
+           (0 <= highlighted_lidx < len(self._polygons)):
+            p.setBrush(QBrush(lot_highlighted_fill_color))
+            p.drawPolygon(self._polygons[highlighted_lidx])
+        if (selected_lidx is not None) and (0 <= selected_lidx < len(self._polygons)):
+            p.setBrush(QBrush(lot_selected_fill_color))
+            p.drawPolygon(self._polygons[selected_lidx])
+
+        # Round-capped points are filled circles of the pen width.
+        pen = QPen(point_default_fill_color, point_size / scale)
+        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+        p.setPen(pen)
+        p.drawPoints(self._vertices)
+        if (highlighted_lidx is not None) and (highlighted_pidx is not None):
+            pen.setColor(point_highlighted_fill_color)
+            p.setPen(pen)
+            p.drawPoint(self._vertices.at(4 * highlighted_lidx + highlighted_pidx))
+
+
+class Canvas(QObject):
+
+    # Image-space rect to repaint, or None for the whole canvas.
+    update_request_sig = pyqtSignal(object)
 
     def __init__(self, lots_data: LotsData, parent=None):
+        super(Canvas, self).__init__(parent)
 
         self.lots_data = lots_data
+        self.overlay = LotOverlay(self.lots_data)
         self.add_lot_dialog = AddLotDialog(self.lots_data)
         self.highlighted_lidx = None
         self.highlighted_pidx = None
@@ -313,6 +426,50 @@ class Canvas:
         self.mouse_pressed_y = None
         self.mouse_pressed_on_lot = False
         self.mouse_pressed_on_point = False
+        self.scale = 1.0
+        self.pending_drag_pos = None
+        self.drag_timer = QTimer(self)
+        self.drag_timer.setSingleShot(True)
+        self.drag_timer.setInterval(frame_interval_msec())
+        self.drag_timer.timeout.connect(self.apply_pending_drag)
+
+    def lot_rect(self, lidx: int) -> Optional[QRectF]:
+        if self.lots_data.get_lot_by_idx(lidx) is None:
+            return None
+        xmin, ymin, xmax, ymax = self.lots_data.lot_bounds(lidx)
+        margin = point_size / self.scale
+        return QRectF(xmin - margin, ymin - margin,
+                      xmax - xmin + 2 * margin, ymax - ymin + 2 * margin)
+
+    def rubber_band_rect(self) -> Optional[QRectF]:
+        if not self.rubber_band_is_visible():
+            return None
+        xmin = min(self.mouse_x, self.mouse_pressed_x)
+        ymin = min(self.mouse_y, self.mouse_pressed_y)
+        xmax = max(self.mouse_x, self.mouse_pressed_x)
+        ymax = max(self.mouse_y, self.mouse_pressed_y)
+        return QRectF(xmin, ymin, xmax - xmin, ymax - ymin)
+
+    def rubber_band_is_visible(self) -> bool:
+        return (self.lots_data.is_addable()) and \
+               (self.mouse_x is not None) and \
+               (self.mouse_y is not None) and \
+               (self.mouse_pressed) and \
+               (self.mouse_pressed_x is not None) and \
+               (self.mouse_pressed_y is not None) and \
+               (not self.mouse_pressed_on_lot) and \
+               (not self.mouse_pressed_on_point)
+
+    def request_lot_update(self, lidx: Optional[int]) -> None:
+        if lidx is None:
+            return
+        rect = self.lot_rect(lidx)
+        if rect is not None:
+            self.update_request_sig.emit(rect)
+
+    def request_rect_update(self, rect: Optional[QRectF]) -> None:
+        if rect is not None:
+            self.update_request_sig.emit(rect)
 
     def key_press_event(self, event: QKeyEvent):
         traceback_and_exit(self.key_press_event_impl, event=event)
@@ -332,43 +489,67 @@ class Canvas:
     def mouse_move_event_impl(self, event: QMouseEvent, pos: QPointF, scale: float) -> None:
         mouse_x = pos.x()
         mouse_y = pos.y()
+        self.scale = scale
+        old_rubber_band_rect = self.rubber_band_rect()
+
+        if self.is_dragging():
+            # Applied at most once per display frame by apply_pending_drag.
+            self.pending_drag_pos = (mouse_x, mouse_y)
+            if not self.drag_timer.isActive():
+                self.drag_timer.start()
+            return
 
+        old_lidx = self.highlighted_lidx
+        old_pidx = self.highlighted_pidx
+        self.highlighted_lidx = None
+        self.highlighted_pidx = None
+        dist, lidx, pidx = self.lots_data.nearest_point(pos.x(), pos.y(), epsilon / scale)
+        if dist is not None:
+            self.highlighted_lidx = lidx
+            self.highlighted_pidx = pidx
+        else:
+            self.highlighted_lidx = self.lots_data.is_point_in_quad(pos.x(), pos.y())
+        if (old_lidx, old_pidx) != (self.highlighted_lidx, self.highlighted_pidx):
+            self.request_lot_update(old_lidx)
+            self.request_lot_update(self.highlighted_lidx)
+
+        self.mouse_x = pos.x()
+        self.mouse_y = pos.y()
+        self.request_rect_update(old_rubber_band_rect)
+        self.request_rect_update(self.rubber_band_rect())
+
+    def is_dragging(self) -> bool:
+        return (self.mouse_pressed_on_point) or \
+               ((self.lots_data.is_editable()) and (self.mouse_pressed_on_lot))
+
+    def apply_pending_drag(self) -> None:
+        traceback_and_exit(self.apply_pending_drag_impl)
+    def apply_pending_drag_impl(self) -> None:
+        if self.pending_drag_pos is None:
+            return
+        mouse_x, mouse_y = self.pending_drag_pos
+        self.pending_drag_pos = None
         if self.mouse_pressed_on_point:
-            points = self.lots_data.get_points_by_idx(self.highlighted_lidx)
-            points[self.highlighted_pidx] = [mouse_x, mouse_y]
-            quad_is_convex = is_polygon_convex(
-                [points[0][0], points[1][0], points[2][0], points[3][0]],
-                [points[0][1], points[1][1], points[2][1], points[3][1]])
-            if not quad_is_convex:
+            points = self.lots_data.get_points_by_idx(self.highlighted_lidx).copy()
+            points[self.highlighted_pidx] = (mouse_x, mouse_y)
+            if not quads_are_convex(points):
                 return
+            self.request_lot_update(self.highlighted_lidx)
             self.lots_data.set_point_by_idx(
                 self.highlighted_lidx,
                 self.highlighted_pidx,
                 mouse_x,
                 mouse_y)
-        elif (self.lots_data.is_editable()) and \
-             (self.mouse_pressed_on_lot) and \
-             (not self.mouse_pressed_on_point):
+            self.request_lot_update(self.highlighted_lidx)
+        elif self.is_dragging():
+            self.request_lot_update(self.highlighted_lidx)
             self.lots_data.move_lot_by_idx(
                 self.highlighted_lidx,
                 mouse_x - self.mouse_x,
                 mouse_y - self.mouse_y)
-        else:
-            self.highlighted_lidx = None
-            self.highlighted_pidx = None
-            lidx_in = self.lots_data.is_point_in_quad(pos.x(), pos.y())
-            dist, lidx, pidx = self.lots_data.nearest_point(pos.x(), pos.y())
-            if dist is not None:
-                if dist < epsilon / scale:
-                    self.highlighted_lidx = lidx
-                    self.highlighted_pidx = pidx
-                else:
-                    if lidx_in is not None:
-                        self.highlighted_lidx = lidx_in
-                        self.highlighted_pidx = None
-
-        self.mouse_x = pos.x()
-        self.mouse_y = pos.y()
+            self.request_lot_update(self.highlighted_lidx)
+        self.mouse_x = mouse_x
+        self.mouse_y = mouse_y
 
     def mouse_press_event(self, event: QMouseEvent, pos: QPointF, scale: float) -> None:
         traceback_and_exit(self.mouse_press_event_impl, event=event, pos=pos, scale=scale)
@@ -391,6 +572,7 @@ class Canvas:
     def mouse_release_event(self, event: QMouseEvent, pos: QPointF, scale: float) -> None:
         traceback_and_exit(self.mouse_release_event_impl, event=event, pos=pos, scale=scale)
     def mouse_release_event_impl(self, event: QMouseEvent, pos: QPointF, scale: float) -> None:
+        self.request_rect_update(self.rubber_band_rect())
         if (self.lots_data.is_addable()) and \
            (event.button() == Qt.MouseButton.LeftButton) and \
            (self.mouse_pressed_x is not None) and \
@@ -402,6 +584,8 @@ class Canvas:
                 pos.x(), pos.y())
 
         if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_timer.stop()
+            self.apply_pending_drag()
             self.mouse_pressed = False
             self.mouse_pressed_on_lot = False
             self.mouse_pressed_on_point = False
@@ -409,56 +593,10 @@ class Canvas:
     def paint_event(self, event: QPaintEvent, painter: QPainter, scale: float) -> None:
         traceback_and_exit(self.paint_event_impl, event=event, painter=painter, scale=scale)
     def paint_event_impl(self, event: QPaintEvent, painter: QPainter, scale: float) -> None:
-        scale = scale
         p = painter
+        self.overlay.draw(p, scale, self.lots_data.selected_idx(), self.highlighted_lidx, self.highlighted_pidx)
 
-        lots = self.lots_data.lots()
-
-        p.setPen(QPen(QColor(0, 0, 0, 0)))
-        for lidx, lot in enumerate(lots):
-            if lot['crop']:
-                lot_fill_color = lot_cropped_fill_color
-            else:
-                lot_fill_color = lot_default_fill_color
-            if   lidx == self.lots_data.selected_idx():
-                lot_fill_color = lot_selected_fill_color
-            elif lidx == self.highlighted_lidx:
-                lot_fill_color = lot_highlighted_fill_color
-            points = self.lots_data.get_points_by_idx(lidx)
-            poly = QPolygonF([
-                QPointF(points[0][0], points[0][1]),
-                QPointF(points[1][0], points[1][1]),
-                QPointF(points[2][0], points[2][1]),
-                QPointF(points[3][0], points[3][1])])
-            p.setBrush(QBrush(lot_fill_color))
-            p.drawPolygon(poly)
-
-        pen = QPen()
-        pen.setWidth(max(1, int(round(2.0 / scale))))
-        p.setPen(pen)
-        for lidx, _ in enumerate(lots):
-            points = self.lots_data.get_points_by_idx(lidx)
-            for pidx, point in enumerate(points):
-                point_fill_color = point_default_fill_color
-                if (lidx == self.highlighted_lidx) and \
-                   (pidx == self.highlighted_pidx):
-                    point_fill_color = point_highlighted_fill_color
-                point_path = QPainterPath()
-                point_path.addEllipse(
-                    point[0] - (point_size / scale) / 2.0,
-                    point[1] - (point_size / scale) / 2.0,
-                    point_size / scale,
-                    point_size / scale)
-                p.fillPath(point_path, point_fill_color)
-
-        if (self.lots_data.is_addable()) and \
-           (self.mouse_x is not None) and \
-           (self.mouse_y is not None) and \
-           (self.mouse_pressed) and \
-           (self.mouse_pressed_x is not None) and \
-           (self.mouse_pressed_y is not None) and \
-           (not self.mouse_pressed_on_lot) and \
-           (not self.mouse_pressed_on_point):
+        if self.rubber_band_is_visible():
             p.setPen(QPen(QColor(0, 0, 0, 0)))
             xmin = min(self.mouse_x, self.mouse_pressed_x)
             ymin = min(self.mouse_y, self.mouse_pressed_y)
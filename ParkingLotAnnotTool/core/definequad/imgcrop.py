@@ -1,12 +1,142 @@
+import cv2
 import json
+import multiprocessing
+import numpy as np
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from PIL import Image, ImageDraw
 from PyQt6.QtCore import QThread, pyqtSignal
 from typing import List, Tuple
 
 from ParkingLotAnnotTool.utils.filesystem import list_by_ext
 
+# Margin around a lot in the crops written by ImageCropWorker/VideoCropWorker.
+CROP_UP_SAMPLE_RATE = 1.2
+
+
+class LotCropPlan:
+    """Crop box and outline mask of one lot, computed once per job."""
+
+    def __init__(self,
+                 contours: List[Tuple[float, float]],
+                 width: int,
+                 height: int,
+                 up_sample_rate: float,
+                 outline_width: int):
+        orig_xmin = min(p[0] for p in contours)
+        orig_xmax = max(p[0] for p in contours)
+        orig_ymin = min(p[1] for p in contours)
+        orig_ymax = max(p[1] for p in contours)
+        w = orig_xmax - orig_xmin
+        h = orig_ymax - orig_ymin
+        long_side = max(w, h)
+        crop_w = (long_side * up_sample_rate)
+        crop_h = crop_w
+        xmin = int(orig_xmin) - (crop_w - w) // 2
+        ymin = int(orig_ymin) - (crop_h - h) // 2
+        xmax = xmin + crop_w
+        ymax = ymin + crop_h
+        # Same rounding as PIL.Image.crop
+        self.box = tuple(int(round(v)) for v in (xmin, ymin, xmax, ymax))
+        self.size = (width, height)
+
+        box_w = max(1, self.box[2] - self.box[0])
+        scale = width / box_w
+        self.contours = np.array(
+            [((p[0] - xmin) * scale, (p[1] - ymin) * scale) for p in contours],
+            dtype=np.float64)
+
+        # The outline is drawn inside the polygon like PIL's ImageDraw.polygon(width=...).
+        shift = 4
+        pts = np.round(self.contours * (1 << shift)).astype(np.int32).reshape(-1, 1, 2)
+        edge = np.zeros((height, width), dtype=np.uint8)
+        cv2.polylines(edge, [pts], True, 255, thickness=outline_width * 2 - 1, lineType=cv2.LINE_8, shift=shift)
+        inside = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(inside, [pts], 255, lineType=cv2.LINE_8, shift=shift)
+        self.outline_mask = (edge > 0) & (inside > 0)
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        x0, y0, x1, y1 = self.box
+        fh, fw = frame.shape[:2]
+        if (0 <= x0) and (0 <= y0) and (x1 <= fw) and (y1 <= fh) and (x0 < x1) and (y0 < y1):
+            src = frame[y0:y1, x0:x1]
+        else:
+            # Pixels outside of the frame are black, as with PIL.Image.crop
+            src = np.zeros((max(1, y1 - y0), max(1, x1 - x0)) + frame.shape[2:], dtype=frame.dtype)
+            sx0, sy0 = max(0, x0), max(0, y0)
+            sx1, sy1 = min(fw, x1), min(fh, y1)
+            if (sx0 < sx1) and (sy0 < sy1):
+                src[sy0 - y0:sy1 - y0, sx0 - x0:sx1 - x0] = frame[sy0:sy1, sx0:sx1]
+        if src.shape[1] >= self.size[0]:
+            interpolation = cv2.INTER_AREA
+        else:
+            interpolation = cv2.INTER_CUBIC
+        return cv2.resize(src, self.size, interpolation=interpolation)
+
+
+class LotCropper:
+    """Crop every lot out of a BGR frame.
+
+    Crop boxes, scales and outline masks are computed once in the constructor, so a
+    frame costs one slice + resize + masked assignment per lot.
+    """
+
+    def __init__(self,
+                 lots: list,
+                 width: int = 224,
+                 height: int = 224,
+                 up_sample_rate: float = CROP_UP_SAMPLE_RATE,
+                 outline_width: int = 5,
+                 outline_color: Tuple[int, int, int] = (0, 0, 255)):
+        self.lots = lots
+        self.outline_color = np.array(outline_color, dtype=np.uint8)
+        self.plans = []
+        for lot in lots:
+            q = lot['quad']
+            contours = [(q[0], q[1]), (q[2], q[3]), (q[4], q[5]), (q[6], q[7])]
+            self.plans.append(LotCropPlan(contours, width, height, up_sample_rate, outline_width))
+
+    def crop(self, frame: np.ndarray, lidx: int) -> np.ndarray:
+        plan = self.plans[lidx]
+        dst = plan.crop(frame)
+        dst[plan.outline_mask] = self.outline_color
+        return dst
+
+    def crop_all(self, frame: np.ndarray) -> List[np.ndarray]:
+        return [self.crop(frame, lidx) for lidx in range(len(self.plans))]
+
+
+# Raw frames handed to a crop process at a time.
+CROP_CHUNK_SIZE = 16
+
+_crop_process_state = {}
+
+
+def _init_crop_process(lots, lot_dir_paths, width, height, quality, cancel_event):
+    _crop_process_state['cropper'] = LotCropper(lots, width, height)
+    _crop_process_state['lot_dir_paths'] = lot_dir_paths
+    _crop_process_state['params'] = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    _crop_process_state['cancel_event'] = cancel_event
+
+
+def crop_frame_files(cropper: LotCropper, lot_dir_paths: List[Path], raw_frame_path, params) -> None:
+    frame = cv2.imread(str(raw_frame_path), cv2.IMREAD_COLOR)
+    name = Path(raw_frame_path).name
+    for lot_dir_path, cropped_image in zip(lot_dir_paths, cropper.crop_all(frame)):
+        cv2.imwrite(str(lot_dir_path / name), cropped_image, params)
+
+
+def _crop_chunk(raw_frame_paths) -> int:
+    state = _crop_process_state
+    done = 0
+    for raw_frame_path in raw_frame_paths:
+        if state['cancel_event'].is_set():
+            break
+        crop_frame_files(state['cropper'], state['lot_dir_paths'], raw_frame_path, state['params'])
+        done += 1
+    return done
+
+
 class ImageCropWorker(QThread):
     MODEL_WIDTH = 224
     MODEL_HEIGHT = 224
@@ -14,7 +144,7 @@ class ImageCropWorker(QThread):
     finished = pyqtSignal()
     canceled = pyqtSignal()
 
-    def __init__(self, scene_json_path: Path, quality=95):
+    def __init__(self, scene_json_path: Path, quality=95, jobs=1):
         super().__init__()
         self.progress.emit(0)
         self.data = {}
@@ -22,69 +152,69 @@ class ImageCropWorker(QThread):
             self.data = json.load(file)
         self.parent_dir_path = scene_json_path.parent
         self.quality = quality
+        self.jobs = jobs
         self._is_canceled = False
+        self._cancel_event = None
 
     def run(self):
         lots = self.data['lots']
-        for lot in lots:
-            os.makedirs((self.parent_dir_path / lot['id']), exist_ok=True)
-
+        lot_dir_paths = [self.parent_dir_path / lot['id'] for lot in lots]
+        for lot_dir_path in lot_dir_paths:
+            os.makedirs(lot_dir_path, exist_ok=True)
         raw_frame_paths = list_by_ext(self.parent_dir_path / "raw", ".jpg")
+
+        if self.jobs > 1:
+            self.run_parallel(lots, lot_dir_paths, raw_frame_paths)
+            return
+
+        cropper = LotCropper(lots, self.MODEL_WIDTH, self.MODEL_HEIGHT)
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+
         total_frames = len(raw_frame_paths)
         for i, raw_frame_path in enumerate(raw_frame_paths):
             if self._is_canceled:
                 self.canceled.emit()
                 return
 
-            image = Image.open(raw_frame_path)
-            for lot in lots:
-                q = lot['quad']
-                contours = [(q[0], q[1]), (q[2], q[3]), (q[4], q[5]), (q[6], q[7])]
-                cropped_image = self.imgcrop(image, contours)
-                cropped_image.save((self.parent_dir_path / lot['id'] / Path(raw_frame_path).name))
+            crop_frame_files(cropper, lot_dir_paths, raw_frame_path, params)
 
             progress = int((i / total_frames) * 100)
             self.progress.emit(progress)
 
         self.finished.emit()
 
-    def cancel(self):
-        self._is_canceled = True
-
-    def get_xmin(self, contours: List[Tuple[int, int]]):
-        return min(contours, key=lambda item: item[0])[0]
-
-    def get_xmax(self, contours: List[Tuple[int, int]]):
-        return max(contours, key=lambda item: item[0])[0]
-
-    def get_ymin(self, contours: List[Tuple[int, int]]):
-        return min(contours, key=lambda item: item[1])[1]
-
-    def get_ymax(self, contours: List[Tuple[int, int]]):
-        return max(contours, key=lambda item: item[1])[1]
+    def run_parallel(self, lots, lot_dir_paths, raw_frame_paths):
+        # spawn: forking a process that runs Qt threads is not safe.
+        context = multiprocessing.get_context("spawn")
+        self._cancel_event = context.Event()
+        if self._is_canceled:
+            self._cancel_event.set()
+        chunks = [raw_frame_paths[i:i + CROP_CHUNK_SIZE]
+                  for i in range(0, len(raw_frame_paths), CROP_CHUNK_SIZE)]
+        total_frames = len(raw_frame_paths)
+        done = 0
+        with ProcessPoolExecutor(
+                max_workers=self.jobs,
+                mp_context=context,
+                initializer=_init_crop_process,
+                initargs=(lots, lot_dir_paths, self.MODEL_WIDTH, self.MODEL_HEIGHT,
+                          self.quality, self._cancel_event)) as executor:
+            futures = [executor.submit(_crop_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                if self._is_canceled:
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    self.canceled.emit()
+                    return
+                done += future.result()
+                progress = int((done / total_frames) * 100)
+                self.progress.emit(progress)
 
-    # TODO implement new method
-    def imgcrop(self, image: Image, contours: List[Tuple[int, int]]) -> Image:
-        up_sample_rate = 1.2
+        if self._is_canceled:
+            self.canceled.emit()
+            return
+        self.finished.emit()
 
-        orig_xmin = self.get_xmin(contours)
-        orig_xmax = self.get_xmax(contours)
-        orig_ymin = self.get_ymin(contours)
-        orig_ymax = self.get_ymax(contours)
-        w = orig_xmax - orig_xmin
-        h = orig_ymax - orig_ymin
-        long_side = max(w, h)
-        crop_w = (long_side * up_sample_rate)
-        crop_h = crop_w
-        xmin = int(orig_xmin) - (crop_w - w) // 2
-        ymin = int(orig_ymin) - (crop_h - h) // 2
-        xmax = xmin + crop_w
-        ymax = ymin + crop_h
-        cropped_img = image.crop((xmin, ymin, xmax, ymax))
-        offseted_contours = [(p[0] - xmin, p[1] - ymin) for p in contours]
-        scale = self.MODEL_WIDTH / cropped_img.size[0]
-        resized_contours = [(p[0] * scale, p[1] * scale) for p in offseted_contours]
-        dst = cropped_img.resize((self.MODEL_WIDTH, self.MODEL_HEIGHT))
-        draw = ImageDraw.Draw(dst)
-        draw.polygon(resized_contours, outline="red", width=5)
-        return dst
+    def cancel(self):
+        self._is_canceled = True
+        if self._cancel_event is not None:
+            self._cancel_event.set()
@@ -1,20 +1,34 @@
 import json
+import numpy as np
 from typing import Optional
 from PyQt6.QtCore import QObject, pyqtSignal, Qt
 from PyQt6.QtWidgets import *
 from PyQt6.QtWidgets import QMessageBox as QMB
 
 from ParkingLotAnnotTool.utils.geometry import *
+from ParkingLotAnnotTool.utils.spatialgrid import UniformGrid, cell_size_for_boxes
 from ..general.dict_to_layout import dict_to_layout
 
 class LotsData(QObject):
+    """Lots of the DefineQuad tool.
+
+    Vertices live in one (N, 4, 2) float array, the remaining fields (id,
+    label, crop...) in a parallel list of dicts. The JSON "quad" lists are
+    only built at the boundary: load, save and get_crop_lots.
+    """
 
     data_changed = pyqtSignal()
     selected_idx_changed = pyqtSignal()
+    lot_changed = pyqtSignal(int)
 
     def __init__(self):
         super().__init__()
         self._lots: Optional[list] = []
+        self._quads = np.zeros((0, 4, 2), dtype=np.float64)
+        # Per-lot revision, bumped whenever a lot changes, and a revision of the
+        # whole list, bumped when lots are added, removed or reloaded.
+        self._revisions = np.zeros(0, dtype=np.int64)
+        self._layout_revision = 0
         self._dirty: bool = False
         self._loaded: bool = False
         self._json_path = None
@@ -23,12 +37,18 @@ class LotsData(QObject):
         self._addable = False
         self._editable = False
         self._selected_idx = None
+        # Bounding boxes of the lots, keyed by lot index.
+        self._grid = UniformGrid()
 
     def reset(self):
         self.may_save()
         self._lots = []
+        self._quads = np.zeros((0, 4, 2), dtype=np.float64)
+        self._revisions = np.zeros(0, dtype=np.int64)
+        self._layout_revision += 1
         self._dirty = False
         self._selected_idx = None
+        self._grid.clear()
         self.data_changed.emit()
 
     def load(self) -> bool:
@@ -36,11 +56,16 @@ class LotsData(QObject):
         with open(self._json_path, 'r', encoding='utf-8') as file:
             data = json.load(file)
         self._image_path = data['image_path']
-        self._lots = data['lots']
+        self._quads = np.array(
+            [lot['quad'] for lot in data['lots']], dtype=np.float64).reshape(-1, 4, 2)
+        self._lots = [{k: v for k, v in lot.items() if k != 'quad'} for lot in data['lots']]
+        self._revisions = np.zeros(len(self._lots), dtype=np.int64)
+        self._layout_revision += 1
         self._dirty = False
         self._loaded = True
         self._selected_idx = None
         self.lots_validation()
+        self.rebuild_grid()
         self.data_changed.emit()
         return True
 
@@ -51,6 +76,35 @@ class LotsData(QObject):
             if 'crop' not in lot.keys():
                 lot['crop'] = False
 
+    def quads(self) -> np.ndarray:
+        """(N, 4, 2) vertices of every lot; a view, not to be modified."""
+        return self._quads
+
+    def revisions(self) -> np.ndarray:
+        return self._revisions
+
+    def layout_revision(self) -> int:
+        return self._layout_revision
+
+    def lot_ids(self):
+        return [lot['id'] for lot in self._lots]
+
+    def lot_bounds(self, lidx: int):
+        quad = self._quads[lidx]
+        xmin, ymin = quad.min(axis=0)
+        xmax, ymax = quad.max(axis=0)
+        return float(xmin), float(ymin), float(xmax), float(ymax)
+
+    def rebuild_grid(self):
+        mins = self._quads.min(axis=1)
+        maxs = self._quads.max(axis=1)
+        self._grid = UniformGrid(cell_size_for_boxes((maxs - mins).max(axis=1).tolist()))
+        for lidx, (xmin, ymin, xmax, ymax) in enumerate(np.hstack([mins, maxs]).tolist()):
+            self._grid.insert(lidx, xmin, ymin, xmax, ymax)
+
+    def update_grid(self, lidx: int):
+        self._grid.insert(lidx, *self.lot_bounds(lidx))
+
     def loaded(self) -> bool:
         return self._loaded
 
@@ -87,18 +141,12 @@ class LotsData(QObject):
         return self.selected_lot()["id"]
 
     def selected_lot_area(self):
-        lot = self.selected_lot()
-        if lot is None:
+        if self.selected_lot() is None:
             return 0.0
-        q = lot["quad"]
-        coordinates = [[q[i], q[i+1]] for i in range(0, len(q), 2)]
-        area = 0.0
-        for i in range(len(coordinates)):
-            j = (i + 1) % len(coordinates)
-            area += coordinates[i][0] * coordinates[j][1]
-            area -= coordinates[j][0] * coordinates[i][1]
-        area = abs(area) / 2.0
-        return area
+        return float(quad_areas(self._quads[self._selected_idx]))
+
+    def lot_areas(self) -> np.ndarray:
+        return quad_areas(self._quads)
 
     def round_floats_recursive(self, obj, precision):
         if isinstance(obj, float):
@@ -109,11 +157,19 @@ class LotsData(QObject):
             return [self.round_floats_recursive(elem, precision) for elem in obj]
         return obj
 
+    def lot_dict(self, lidx: int) -> dict:
+        """The lot as stored in JSON, with its vertices as a flat "quad" list."""
+        lot = self._lots[lidx]
+        data = {'id': lot['id'], 'quad': self._quads[lidx].reshape(-1).tolist()}
+        data.update((k, v) for k, v in lot.items() if k != 'id')
+        return data
+
     def save(self):
         data = {
             "version": "0.3",
             "image_path": self._image_path,
-            "lots": self.round_floats_recursive(self._lots, 3)}
+            "lots": self.round_floats_recursive(
+                [self.lot_dict(lidx) for lidx in range(len(self._lots))], 3)}
         with open(self._json_path, 'w', encoding='utf-8') as file:
             json.dump(data, file, ensure_ascii=False, indent=4)
         self._loaded = True
@@ -146,9 +202,9 @@ class LotsData(QObject):
 
     def get_crop_lots(self):
         lots = []
-        for lot in self.lots():
+        for lidx, lot in enumerate(self.lots()):
             if lot['crop'] is True:
-                lots.append(lot)
+                lots.append(self.lot_dict(lidx))
         return lots
 
     def get_lot_by_idx(self, lidx: int):
@@ -158,78 +214,58 @@ class LotsData(QObject):
         return lots[lidx]
 
     def get_points_by_idx(self, lidx: int):
-        lot = self.get_lot_by_idx(lidx)
-        if lot is None:
+        """(4, 2) vertices of the lot, a view into the quads array."""
+        if (lidx is None) or (len(self._lots) <= lidx):
             return None
-        quad = lot['quad']
-        return [[quad[0], quad[1]],
-                [quad[2], quad[3]],
-                [quad[4], quad[5]],
-                [quad[6], quad[7]]]
+        return self._quads[lidx]
 
     def set_point_by_idx(self, lidx: int, pidx: int, x: float, y: float):
-        lot = self.get_lot_by_idx(lidx)
-        if lot is None:
+        if self.get_lot_by_idx(lidx) is None:
             return
-        lot['quad'][pidx * 2 + 0] = x
-        lot['quad'][pidx * 2 + 1] = y
+        self._quads[lidx, pidx] = (x, y)
+        self._revisions[lidx] += 1
+        self.update_grid(lidx)
         self._dirty = True
 
     def move_lot_by_idx(self, lidx: int, dx: float, dy: float):
-        lot = self.get_lot_by_idx(lidx)
-        if lot is None:
+        if self.get_lot_by_idx(lidx) is None:
             return
-        quad = lot['quad']
-        quad[0] += dx
-        quad[1] += dy
-        quad[2] += dx
-        quad[3] += dy
-        quad[4] += dx
-        quad[5] += dy
-        quad[6] += dx
-        quad[7] += dy
+        self._quads[lidx] += (dx, dy)
+        self._revisions[lidx] += 1
+        self.update_grid(lidx)
         self._dirty = True
 
     def delete_selected_area(self):
         if self._selected_idx is None:
             return
         self._lots.pop(self._selected_idx)
+        self._quads = np.delete(self._quads, self._selected_idx, axis=0)
+        self._revisions = np.delete(self._revisions, self._selected_idx)
+        self._layout_revision += 1
         self._selected_idx = None
+        # Indices after the deleted lot shift down.
+        self.rebuild_grid()
         self.data_changed.emit()
 
-    def nearest_point(self, x: float, y: float):
-        dist, lidx, pidx = None, None, None
-        for lidx_tmp, lot in enumerate(self._lots):
-            for pidx_tmp, point in enumerate(self.get_points_by_idx(lidx_tmp)):
-                dist_tmp = ((point[0] - x)**2 + (point[1] - y)**2)**(1/2)
-                if (dist is None) or (dist_tmp < dist):
-                    lidx = lidx_tmp
-                    pidx = pidx_tmp
-                    dist = dist_tmp
-        return dist, lidx, pidx
-
-    def intersect(
-        self,
-        a : Vector2d,
-        b : Triangle2d
-        ) -> bool:
-        s = b.y1 * b.x3 - b.x1 * b.y3 + (b.y3 - b.y1) * a.x + (b.x1 - b.x3) * a.y
-        t = b.x1 * b.y2 - b.y1 * b.x2 + (b.y1 - b.y2) * a.x + (b.x2 - b.x1) * a.y
-        if (s < 0) != (t < 0):
-            return False
-        A = -b.y2 * b.x3 + b.y1 * (b.x3 - b.x2) + b.x1 * (b.y2 - b.y3) + b.x2 * b.y3
-        if A < 0:
-            return (s <= 0) and (s + t >= A)
-        else:
-            return (s >= 0) and (s + t <= A)
+    def candidate_lots(self, x: float, y: float, radius: float = 0.0) -> np.ndarray:
+        return np.array(sorted(self._grid.query(x, y, radius)), dtype=np.intp)
+
+    def nearest_point(self, x: float, y: float, max_dist: Optional[float] = None):
+        """Nearest vertex as (dist, lidx, pidx), only among vertices within max_dist if given."""
+        if max_dist is None:
+            return nearest_vertex(self._quads, x, y)
+        candidates = self.candidate_lots(x, y, max_dist)
+        dist, i, pidx = nearest_vertex(self._quads[candidates], x, y)
+        if (dist is None) or (dist >= max_dist):
+            return None, None, None
+        return dist, int(candidates[i]), pidx
 
     def is_point_in_quad(self, x: float, y: float):
-        for lidx, lot in enumerate(self._lots):
-            x1, y1, x2, y2, x3, y3, x4, y4 = lot['quad']
-            if self.intersect(Vector2d(x, y), Triangle2d(x1, y1, x2, y2, x3, y3)) or \
-               self.intersect(Vector2d(x, y), Triangle2d(x1, y1, x4, y4, x3, y3)):
-                return lidx
-        return None
+        candidates = self.candidate_lots(x, y)
+        inside = np.flatnonzero(points_in_quads(self._quads[candidates], x, y))
+        if len(inside) == 0:
+            return None
+        return int(candidates[inside[0]])
 
     def add_lot(
             self,
@@ -240,8 +276,12 @@ class LotsData(QObject):
             x4: float, y4: float):
         self._lots.append({
             'id': lot_id,
-            'quad': [x1, y1, x2, y2, x3, y3, x4, y4],
             'crop': False})
+        quad = np.array([[x1, y1], [x2, y2], [x3, y3], [x4, y4]], dtype=np.float64)
+        self._quads = np.concatenate([self._quads, quad[np.newaxis]])
+        self._revisions = np.append(self._revisions, 0)
+        self._layout_revision += 1
+        self.update_grid(len(self._lots) - 1)
         self._dirty = True
         self.data_changed.emit()
 
@@ -250,7 +290,9 @@ class LotsData(QObject):
         if lot is None:
             return
         lot['crop'] = crop_flag
+        self._revisions[lidx] += 1
         self._dirty = True
+        self.lot_changed.emit(lidx)
 
     def info(self):
         return {
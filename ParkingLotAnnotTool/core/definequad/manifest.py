@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.json"
+# Bytes hashed from the head and the tail of the video. Hashing a 24h recording
+# completely would take longer than resuming saves.
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def video_fingerprint(video_path) -> dict:
+    video_path = Path(video_path)
+    stat = video_path.stat()
+    sha1 = hashlib.sha1()
+    sha1.update(str(stat.st_size).encode())
+    with open(video_path, 'rb') as file:
+        sha1.update(file.read(HASH_CHUNK_SIZE))
+        if stat.st_size > HASH_CHUNK_SIZE:
+            file.seek(max(HASH_CHUNK_SIZE, stat.st_size - HASH_CHUNK_SIZE))
+            sha1.update(file.read(HASH_CHUNK_SIZE))
+    return {
+        "path": str(video_path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "hash": sha1.hexdigest()}
+
+
+def remove_frames_from(output_dir, first: int) -> int:
+    """Delete the NNNNN.jpg outputs numbered first or above; returns how many were removed."""
+    removed = 0
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            if (ext == '.jpg') and stem.isdigit() and (int(stem) >= first) and entry.is_file():
+                os.remove(entry.path)
+                removed += 1
+    return removed
+
+
+class ExtractionManifest:
+    """Record of a frame extraction run, stored as raw/manifest.json.
+
+    Frames are identified by their output number (00000.jpg -> 0). The set of
+    finished frames is updated from the writer threads and saved periodically,
+    so an interrupted run can continue where it stopped.
+    """
+
+    def __init__(self, output_dir):
+        self._path = Path(output_dir) / MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._source = None
+        self._interval = None
+        self._quality = None
+        self._frames = set()
+        self._complete = False
+
+    def path(self) -> Path:
+        return self._path
+
+    def load(self) -> bool:
+        if not self._path.exists():
+            return False
+        try:
+            with open(self._path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            self._source = data['source']
+            self._interval = data['interval']
+            self._quality = data['quality']
+            self._frames = set(data['frames'])
+            self._complete = data['complete']
+        except (ValueError, KeyError, TypeError):
+            return False
+        return True
+
+    def matches(self, source: dict, interval, quality) -> bool:
+        if self._source is None:
+            return False
+        return (self._source["size"] == source["size"]) and \
+               (self._source["mtime"] == source["mtime"]) and \
+               (self._source["hash"] == source["hash"]) and \
+               (self._interval == interval) and \
+               (self._quality == quality)
+
+    def reset(self, source: dict, interval, quality):
+        with self._lock:
+            self._source = source
+            self._interval = interval
+            self._quality = quality
+            self._frames = set()
+            self._complete = False
+
+    def is_complete(self) -> bool:
+        return self._complete
+
+    def set_complete(self, value: bool):
+        self._complete = value
+
+    def frames(self) -> set:
+        with self._lock:
+            return set(self._frames)
+
+    def finished_frames(self) -> set:
+        """Finished frame numbers whose file still exists."""
+        output_dir = self._path.parent
+        return {n for n in self.frames() if (output_dir / f'{n:05d}.jpg').exists()}
+
+    def mark_done(self, n: int):
+        with self._lock:
+            self._frames.add(n)
+
+    def save(self):
+        with self._lock:
+            data = {
+                "version": "0.3",
+                "source": self._source,
+                "interval": self._interval,
+                "quality": self._quality,
+                "complete": self._complete,
+                "frames": sorted(self._frames)}
+        tmp_path = self._path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, self._path)
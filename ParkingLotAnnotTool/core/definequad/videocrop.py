@@ -0,0 +1,84 @@
+import cv2
+import json
+import os
+from pathlib import Path
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from ParkingLotAnnotTool.utils.imagewriter import ImageWriterPool
+from .imgcrop import ImageCropWorker, LotCropper
+from .videoextract import DEFAULT_GOP_SIZE, sample_frames
+
+
+class VideoCropWorker(QThread):
+    """Extract frames and crop the lots in one pass, without writing raw/ frames.
+
+    Each sampled frame is cropped in memory and only <lot_id>/00000.jpg... are
+    written, plus preview/00000.jpg scaled by preview_scale unless it is None.
+    """
+    progress = pyqtSignal(int)
+    finished = pyqtSignal()
+    canceled = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, video_path, scene_json_path: Path, interval, quality=95,
+                 preview_scale=0.5, gop_size=DEFAULT_GOP_SIZE, num_writers=None):
+        super().__init__()
+        with open(scene_json_path, 'r', encoding='utf-8') as file:
+            self.data = json.load(file)
+        self.video_path = video_path
+        self.parent_dir_path = Path(scene_json_path).parent
+        self.interval = interval
+        self.quality = quality
+        self.preview_scale = preview_scale
+        self.gop_size = gop_size
+        self.num_writers = num_writers
+        self._is_canceled = False
+
+    def run(self):
+        lots = self.data['lots']
+        lot_dir_paths = [self.parent_dir_path / lot['id'] for lot in lots]
+        for lot_dir_path in lot_dir_paths:
+            os.makedirs(lot_dir_path, exist_ok=True)
+        preview_dir_path = self.parent_dir_path / "preview"
+        if self.preview_scale is not None:
+            os.makedirs(preview_dir_path, exist_ok=True)
+        cropper = LotCropper(lots, ImageCropWorker.MODEL_WIDTH, ImageCropWorker.MODEL_HEIGHT)
+
+        cap = cv2.VideoCapture(str(self.video_path))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_interval = max(1, round(fps * self.interval))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        frame_indices = range(0, total_frames, frame_interval)
+        writer = ImageWriterPool([cv2.IMWRITE_JPEG_QUALITY, self.quality], self.num_writers)
+
+        try:
+            for saved_count, (frame_idx, frame) in enumerate(sample_frames(cap, frame_indices, self.gop_size)):
+                if self._is_canceled:
+                    writer.cancel()
+                    cap.release()
+                    self.canceled.emit()
+                    return
+
+                name = f'{saved_count:05d}.jpg'
+                for lot_dir_path, cropped_image in zip(lot_dir_paths, cropper.crop_all(frame)):
+                    writer.submit(lot_dir_path / name, cropped_image)
+                if self.preview_scale is not None:
+                    preview = cv2.resize(frame, None, fx=self.preview_scale, fy=self.preview_scale, interpolation=cv2.INTER_AREA)
+                    writer.submit(preview_dir_path / name, preview)
+
+                progress = int((frame_idx / total_frames) * 100)
+                self.progress.emit(progress)
+            writer.close()
+        except Exception as e:
+            writer.cancel()
+            cap.release()
+            self.error.emit(str(e))
+            self.canceled.emit()
+            return
+
+        cap.release()
+        self.finished.emit()
+
+    def cancel(self):
+        self._is_canceled = True
@@ -1,50 +1,141 @@
 import cv2
 import os
+import time
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from ParkingLotAnnotTool.utils.imagewriter import ImageWriterPool
+from .manifest import ExtractionManifest, remove_frames_from, video_fingerprint
+
+# ffmpeg/x264 default keyint. Used when the caller does not know the GOP size of the video.
+DEFAULT_GOP_SIZE = 250
+# Cost of a seek itself (demuxer seek + decoder flush), in units of decoded frames.
+SEEK_OVERHEAD = 8
+# Seconds between manifest saves while extracting.
+MANIFEST_SAVE_INTERVAL = 2.0
+
+
+def seek_is_cheaper(pos: int, target: int, gop_size: int) -> bool:
+    """Decide whether seeking to target costs less than decoding forward from pos."""
+    if target < pos:
+        return True
+    stream_cost = target - pos
+    # A seek lands on the keyframe at or before target and decodes forward from there.
+    seek_cost = SEEK_OVERHEAD + target % gop_size
+    return seek_cost < stream_cost
+
+
+def sample_frames(cap: cv2.VideoCapture, frame_indices, gop_size: int = DEFAULT_GOP_SIZE):
+    """Yield (frame_idx, frame) for each index in ascending frame_indices.
+
+    Frames between two samples are skipped with grab() (no color conversion) as long as
+    that is cheaper than a keyframe-aligned seek, otherwise the capture seeks directly.
+    """
+    pos = 0  # index of the frame the next grab() returns
+    for frame_idx in frame_indices:
+        if seek_is_cheaper(pos, frame_idx, gop_size):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        else:
+            while pos < frame_idx:
+                if not cap.grab():
+                    return
+                pos += 1
+        ret, frame = cap.read()
+        if not ret:
+            return
+        pos = frame_idx + 1
+        yield frame_idx, frame
+
+
 class VideoExtractWorker(QThread):
+    """Extract frames to output_dir. A failed write emits error with its message, then canceled."""
     progress = pyqtSignal(int)
     finished = pyqtSignal()
     canceled = pyqtSignal()
+    error = pyqtSignal(str)
 
-    def __init__(self, video_path, output_dir, interval, quality=95):
+    def __init__(self, video_path, output_dir, interval, quality=95, gop_size=DEFAULT_GOP_SIZE, num_writers=None):
         super().__init__()
         self.video_path = video_path
         self.output_dir = output_dir
         self.interval = interval
         self.quality = quality
+        self.gop_size = gop_size
+        self.num_writers = num_writers
         self._is_canceled = False
 
+    def can_resume(self) -> bool:
+        """True if output_dir holds a manifest of a run with the same video and parameters."""
+        manifest = ExtractionManifest(self.output_dir)
+        if not manifest.load():
+            return False
+        return manifest.matches(video_fingerprint(self.video_path), self.interval, self.quality)
+
     def run(self):
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
-        cap = cv2.VideoCapture(self.video_path)
+        source = video_fingerprint(self.video_path)
+        manifest = ExtractionManifest(self.output_dir)
+        matched = manifest.load() and manifest.matches(source, self.interval, self.quality)
+        if not matched:
+            manifest.reset(source, self.interval, self.quality)
+        finished_frames = manifest.finished_frames()
+        if manifest.is_complete() and finished_frames == manifest.frames():
+            self.progress.emit(100)
+            self.finished.emit()
+            return
+        manifest.set_complete(False)
+
+        cap = cv2.VideoCapture(str(self.video_path))
         fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = round(fps * self.interval)
+        frame_interval = max(1, round(fps * self.interval))
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if not matched:
+            # Frames of a run with other parameters beyond the new plan would stay
+            # in the catalog; the ones within it are overwritten.
+            remove_frames_from(self.output_dir, len(range(0, total_frames, frame_interval)))
 
-        frame_indices = range(0, total_frames, frame_interval)
-        saved_count = 0
+        # Frame n of the output is frame n * frame_interval of the video.
+        frame_indices = [frame_idx for frame_idx in range(0, total_frames, frame_interval)
+                         if frame_idx // frame_interval not in finished_frames]
+        writer = ImageWriterPool([cv2.IMWRITE_JPEG_QUALITY, self.quality], self.num_writers, on_written=manifest.mark_done)
+        saved_at = time.monotonic()
 
-        for frame_idx in frame_indices:
-            if self._is_canceled:
-                cap.release()
-                self.canceled.emit()
-                return
+        try:
+            for frame_idx, frame in sample_frames(cap, frame_indices, self.gop_size):
+                if self._is_canceled:
+                    writer.cancel()
+                    cap.release()
+                    manifest.save()
+                    self.canceled.emit()
+                    return
 
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frame_filename = os.path.join(self.output_dir, f'{saved_count:05d}.jpg')
-            cv2.imwrite(frame_filename, frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
-            saved_count += 1
+                saved_count = frame_idx // frame_interval
+                frame_filename = os.path.join(self.output_dir, f'{saved_count:05d}.jpg')
+                writer.submit(frame_filename, frame, saved_count)
+
+                if time.monotonic() - saved_at > MANIFEST_SAVE_INTERVAL:
+                    manifest.save()
+                    saved_at = time.monotonic()
 
-            progress = int((frame_idx / total_frames) * 100)
-            self.progress.emit(progress)
+                progress = int((frame_idx / total_frames) * 100)
+                self.progress.emit(progress)
+            writer.close()
+        except Exception as e:
+            # Raised from run() nothing would end the progress dialog or the CLI.
+            writer.cancel()
+            cap.release()
+            try:
+                manifest.save()
+            except OSError:
+                pass
+            self.error.emit(str(e))
+            self.canceled.emit()
+            return
 
         cap.release()
+        manifest.set_complete(True)
+        manifest.save()
         self.finished.emit()
 
     def cancel(self):
@@ -5,6 +5,7 @@ from PyQt6.QtWidgets import *
 import numpy as np
 from ParkingLotAnnotTool.utils.trace import traceback_and_exit
 from ParkingLotAnnotTool.utils.math import *
+from .tilepyramid import TilePyramidRenderer
 
 
 class CanvasPicture(QWidget):
@@ -28,34 +29,38 @@ class CanvasPicture(QWidget):
         self.scale: float = 1.0
         self.painter = QPainter()
         self.pixmap: Optional[QPixmap] = None
+        self._image_buffer: Optional[np.ndarray] = None
+        self.tile_renderer = TilePyramidRenderer()
+        self.tile_renderer.tile_loaded.connect(self.update)
 
         self.setMouseTracking(True)
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         self.setFocus()
 
+        self.setAutoFillBackground(True)
+        pal = self.palette()
+        pal.setColor(self.backgroundRole(), QColor(232, 232, 232, 255))
+        self.setPalette(pal)
+
     def enterEvent(self, event: QEnterEvent) -> None:
         traceback_and_exit(self.enterEvent_impl, event=event)
     def enterEvent_impl(self, event: QEnterEvent) -> None:
         self.enter_event_sig.emit(event)
-        self.update()
 
     def focusOutEvent(self, event: QFocusEvent) -> None:
         traceback_and_exit(self.focusOutEvent_impl, event=event)
     def focusOutEvent_impl(self, event: QFocusEvent) -> None:
         self.focus_out_event_sig.emit(event)
-        self.update()
 
     def keyPressEvent(self, event: QKeyEvent) -> None:
         traceback_and_exit(self.keyPressEvent_impl, event=event)
     def keyPressEvent_impl(self, event: QKeyEvent) -> None:
         self.key_press_event_sig.emit(event)
-        self.update()
 
     def leaveEvent(self, event: QEvent) -> None:
         traceback_and_exit(self.leaveEvent_impl, event=event)
     def leaveEvent_impl(self, event: QEvent) -> None:
         self.leave_event_sig.emit(event)
-        self.update()
 
     def mouseDoubleClickEvent(self, event: QMouseEvent) -> None:
         traceback_and_exit(self.mouseDoubleClickEvent_impl, event=event)
@@ -66,7 +71,6 @@ class CanvasPicture(QWidget):
             event,
             self.__transform_pos(QPointF(event.pos())),
             self.scale)
-        self.update()
 
     def mouseMoveEvent(self, event: QMouseEvent) -> None:
         traceback_and_exit(self.mouseMoveEvent_impl, event=event)
@@ -77,7 +81,6 @@ class CanvasPicture(QWidget):
             event,
             self.__transform_pos(QPointF(event.pos())),
             self.scale)
-        self.update()
 
     def mousePressEvent(self, event: QMouseEvent) -> None:
         traceback_and_exit(self.mousePressEvent_impl, event=event)
@@ -88,7 +91,6 @@ class CanvasPicture(QWidget):
             event,
             self.__transform_pos(QPointF(event.pos())),
             self.scale)
-        self.update()
 
     def mouseReleaseEvent(self, event: QMouseEvent) -> None:
         traceback_and_exit(self.mouseReleaseEvent_impl, event=event)
@@ -99,7 +101,6 @@ class CanvasPicture(QWidget):
             event,
             self.__transform_pos(QPointF(event.pos())),
             self.scale)
-        self.update()
 
     def paintEvent(self, event: QPaintEvent) -> None:
         traceback_and_exit(self.paintEvent_impl, event=event)
@@ -116,19 +117,17 @@ class CanvasPicture(QWidget):
 
         p.scale(self.scale, self.scale)
         p.translate(self.__offset_to_center())
-        p.drawPixmap(0, 0, self.pixmap)
+        if self.tile_renderer.is_active():
+            exposed = QRectF(event.rect())
+            exposed = QRectF(self.__transform_pos(exposed.topLeft()), self.__transform_pos(exposed.bottomRight()))
+            self.tile_renderer.draw(p, exposed, self.scale, self.pixmap)
+        else:
+            p.drawPixmap(0, 0, self.pixmap)
 
         self.paint_event_sig.emit(event, p, self.scale)
 
         p.end()
 
-        self.setAutoFillBackground(True)
-        pal = self.palette()
-        pal.setColor(self.backgroundRole(), QColor(232, 232, 232, 255))
-        self.setPalette(pal)
-
-        self.update()
-
     def wheelEvent(self, event: QWheelEvent) -> None:
         traceback_and_exit(self.wheelEvent_impl, event=event)
     def wheelEvent_impl(self, event: QWheelEvent) -> None:
@@ -141,7 +140,6 @@ class CanvasPicture(QWidget):
             v_delta and self.scroll_request_sig.emit(v_delta, Qt.Orientation.Vertical)
             h_delta and self.scroll_request_sig.emit(h_delta, Qt.Orientation.Horizontal)
         event.accept()
-        self.update()
 
     def sizeHint(self) -> QSize:
         return traceback_and_exit(self.sizeHint_impl)
@@ -159,9 +157,18 @@ class CanvasPicture(QWidget):
         if img is None:
             qimg = QImage(1920, 1080, QImage.Format.Format_BGR888)
             qimg.fill(QColor(232, 232, 232))
-            self.pixmap = QPixmap.fromImage(qimg)
+            self._image_buffer = None
+        else:
+            # Wrap the array without copying it; QImage does not own the buffer,
+            # so it is kept alive alongside the image.
+            buffer = np.ascontiguousarray(img)
+            qimg = QImage(buffer.data, buffer.shape[1], buffer.shape[0], buffer.strides[0],
+                          QImage.Format.Format_BGR888)
+            self._image_buffer = buffer
+        self.tile_renderer.set_image(self._image_buffer)
+        if (self.pixmap is not None) and (self.pixmap.size() == qimg.size()):
+            self.pixmap.convertFromImage(qimg)
         else:
-            qimg = QImage(img.flatten(), img.shape[1], img.shape[0], QImage.Format.Format_BGR888)
             self.pixmap = QPixmap.fromImage(qimg)
         self.update()
 
@@ -170,6 +177,21 @@ class CanvasPicture(QWidget):
         self.adjustSize()
         self.update()
 
+    def request_update(self, rect: Optional[QRectF] = None) -> None:
+        """Repaint rect, given in image coordinates, or the whole canvas if it is None."""
+        if (rect is None) or (self.pixmap is None):
+            self.update()
+            return
+        s = self.scale
+        offset = self.__offset_to_center()
+        widget_rect = QRectF(
+            (rect.x() + offset.x()) * s,
+            (rect.y() + offset.y()) * s,
+            rect.width() * s,
+            rect.height() * s)
+        # Antialiased edges spill over by a pixel.
+        self.update(widget_rect.toAlignedRect().adjusted(-2, -2, 2, 2))
+
     def __transform_pos(self, point):
         """Convert from widget-logical coordinates to painter-logical coordinates."""
         return point / self.scale - self.__offset_to_center()
@@ -0,0 +1,126 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional
+
+import numpy as np
+from PyQt6.QtCore import QCoreApplication, QThread, pyqtSignal
+
+
+class FrameCache:
+    """Thread-safe LRU cache of images, bounded by the total size of the arrays."""
+
+    def __init__(self, max_mbytes: float = 256):
+        self._max_bytes = int(max_mbytes * 1024 * 1024)
+        self._bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def put(self, key: Hashable, img: Optional[np.ndarray]) -> None:
+        if img is None:
+            return
+        # Cached images are shared between threads and consumers.
+        img.flags.writeable = False
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._items[key] = img
+            self._bytes += img.nbytes
+            while self._bytes > self._max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+class FramePrefetcher(QThread):
+    """Fill a FrameCache in the background.
+
+    request() replaces the pending keys, so only the latest scrub position is
+    prefetched. loader(key) must be safe to call from this thread. loaded is
+    emitted with the key of every image put in the cache, failed with the key
+    and the error of every loader call that raised. Call drop_pending()
+    before changing what loader reads or clearing the cache.
+    """
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(object, str)
+
+    def __init__(self, cache: FrameCache, loader: Callable[[Hashable], Optional[np.ndarray]]):
+        super().__init__()
+        self._cache = cache
+        self._loader = loader
+        self._pending = []
+        self._loading = False
+        self._condition = threading.Condition()
+        self._is_stopped = False
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    def request(self, keys: Iterable[Hashable]) -> None:
+        with self._condition:
+            self._pending = [key for key in keys if key not in self._cache]
+            self._condition.notify_all()
+        if not self.isRunning() and not self._is_stopped:
+            self.start()
+
+    def drop_pending(self) -> None:
+        """Drop the pending keys and wait until the key being loaded, if any, is in the cache."""
+        with self._condition:
+            self._pending = []
+            while self._loading:
+                self._condition.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._is_stopped:
+                    self._condition.wait()
+                if self._is_stopped:
+                    return
+                key = self._pending.pop(0)
+                self._loading = True
+            try:
+                if key in self._cache:
+                    continue
+                try:
+                    img = self._loader(key)
+                except Exception as e:
+                    # The GUI thread loads the frame again when it is shown.
+                    self.failed.emit(key, repr(e))
+                    continue
+                if img is not None:
+                    self._cache.put(key, img)
+                    self.loaded.emit(key)
+            finally:
+                with self._condition:
+                    self._loading = False
+                    self._condition.notify_all()
+
+    def stop(self):
+        with self._condition:
+            self._is_stopped = True
+            self._pending = []
+            self._condition.notify_all()
+        self.wait()
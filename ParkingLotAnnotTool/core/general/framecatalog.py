@@ -0,0 +1,99 @@
+import bisect
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+CATALOG_NAME = "frames.json"
+FRAME_EXT = ".jpg"
+
+
+def frame_sort_key(frame: str) -> Tuple[int, str]:
+    # Frame numbers are zero-padded to 5 digits and grow wider past 99999.
+    return (len(frame), frame)
+
+
+class FrameCatalog:
+    """Sorted frame names of a dataset, scanned once and cached in frames.json.
+
+    The cache is keyed by the frames directory and its mtime, which changes
+    whenever a frame is added or removed. Frames need not be contiguous: the
+    slider index of a frame is its position in the catalog, not its number.
+    """
+
+    def __init__(self, catalog_path: Path):
+        self._catalog_path = Path(catalog_path)
+        self._frames_dir = None
+        self._frames: List[str] = []
+        self._keys: List[Tuple[int, str]] = []
+
+    def path(self) -> Path:
+        return self._catalog_path
+
+    def load(self, frames_dir: Path) -> None:
+        self._frames_dir = Path(frames_dir)
+        try:
+            mtime_ns = os.stat(self._frames_dir).st_mtime_ns
+        except FileNotFoundError:
+            self.set_frames([])
+            return
+        dir_name = os.path.relpath(self._frames_dir, self._catalog_path.parent)
+        if self._catalog_path.exists():
+            with open(self._catalog_path, 'r', encoding='utf-8') as file:
+                catalog = json.load(file)
+            if (catalog.get("dir") == dir_name) and (catalog.get("mtime_ns") == mtime_ns):
+                # Catalogs written before frames were sorted by number are sorted again.
+                self.set_frames(sorted(catalog["frames"], key=frame_sort_key))
+                return
+        self.set_frames(self.scan())
+        self.save(dir_name, mtime_ns)
+
+    def set_frames(self, frames: List[str]) -> None:
+        self._frames = frames
+        self._keys = [frame_sort_key(frame) for frame in frames]
+
+    def scan(self) -> List[str]:
+        with os.scandir(self._frames_dir) as entries:
+            frames = [entry.name[:-len(FRAME_EXT)] for entry in entries
+                      if entry.name.endswith(FRAME_EXT) and entry.is_file()]
+        frames.sort(key=frame_sort_key)
+        return frames
+
+    def save(self, dir_name: str, mtime_ns: int) -> None:
+        catalog = {"dir": dir_name, "mtime_ns": mtime_ns, "frames": self._frames}
+        tmp_path = self._catalog_path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(catalog, file)
+            os.replace(tmp_path, self._catalog_path)
+        except OSError:
+            # Read-only datasets are scanned again next time.
+            pass
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def frames(self) -> List[str]:
+        return self._frames
+
+    def file_names(self) -> List[str]:
+        return [frame + FRAME_EXT for frame in self._frames]
+
+    def frame_at(self, idx: int) -> str:
+        if 0 <= idx < len(self._frames):
+            return self._frames[idx]
+        # Without a catalog (no frames found), frames are numbered like the extractors do.
+        return f"{idx:05d}"
+
+    def index_of(self, frame: str) -> Optional[int]:
+        i = bisect.bisect_left(self._keys, frame_sort_key(frame))
+        if (i < len(self._frames)) and (self._frames[i] == frame):
+            return i
+        return None
+
+    def nearest_index(self, frame: str) -> int:
+        """Index of frame, or of the last frame before it if it is missing."""
+        if not self._frames:
+            return int(frame)
+        i = bisect.bisect_right(self._keys, frame_sort_key(frame))
+        return max(i - 1, 0)
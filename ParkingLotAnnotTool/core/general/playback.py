@@ -0,0 +1,93 @@
+from typing import Callable, List, Optional
+
+from PyQt6.QtCore import QElapsedTimer, QObject, QTimer, pyqtSignal
+
+# Frames per second at 1x, the rate of holding down a seekbar step button.
+BASE_FPS = 10
+SPEEDS = (1, 2, 4, 8, 16, 32, 64)
+# Scheduler tick; faster speeds advance several frames per tick.
+TICK_MSEC = 16
+# Upcoming ticks whose frames are decoded ahead.
+LOOKAHEAD_TICKS = 6
+
+
+class PlaybackController(QObject):
+    """Play frames at BASE_FPS * speed, tracking wall-clock time.
+
+    Every tick the frame due at the current time is computed. If it is not
+    decoded yet, the newest decoded frame since the last one shown is
+    emitted instead, or none at all, so slow decoding drops frames rather
+    than slowing playback down. The frames due at the next ticks are handed
+    to request() to be decoded ahead.
+    """
+    frame_requested = pyqtSignal(int)
+    playing_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._speed = 1
+        self._maximum = 0
+        self._start_idx = 0
+        self._shown_idx = 0
+        self._clock = QElapsedTimer()
+        self._timer = QTimer(self)
+        self._timer.setInterval(TICK_MSEC)
+        self._timer.timeout.connect(self.tick)
+        self._is_ready: Callable[[int], bool] = lambda idx: True
+        self._request: Optional[Callable[[List[int]], None]] = None
+
+    def set_source(self, is_ready: Callable[[int], bool], request: Callable[[List[int]], None]) -> None:
+        """is_ready(idx) tells whether a frame can be shown without decoding; request(idxs) decodes ahead."""
+        self._is_ready = is_ready
+        self._request = request
+
+    def speed(self) -> int:
+        return self._speed
+
+    def set_speed(self, speed: int) -> None:
+        if self.is_playing():
+            # Restart the clock from the frame on screen, so the position does not jump.
+            self._start_idx = self._shown_idx
+            self._clock.restart()
+        self._speed = speed
+
+    def is_playing(self) -> bool:
+        return self._timer.isActive()
+
+    def play(self, start_idx: int, maximum: int) -> None:
+        if maximum <= start_idx:
+            return
+        self._start_idx = start_idx
+        self._shown_idx = start_idx
+        self._maximum = maximum
+        self._clock.start()
+        self._timer.start()
+        self.playing_changed.emit(True)
+
+    def stop(self) -> None:
+        if not self.is_playing():
+            return
+        self._timer.stop()
+        self.playing_changed.emit(False)
+
+    def due_index(self, msec: float) -> int:
+        return min(self._start_idx + int(msec * BASE_FPS * self._speed / 1000), self._maximum)
+
+    def tick(self) -> None:
+        msec = self._clock.elapsed()
+        due = self.due_index(msec)
+        for idx in range(due, self._shown_idx, -1):
+            if self._is_ready(idx):
+                self._shown_idx = idx
+                self.frame_requested.emit(idx)
+                break
+        if self._shown_idx >= self._maximum:
+            self.stop()
+            return
+        if self._request is not None:
+            upcoming = []
+            for i in range(LOOKAHEAD_TICKS + 1):
+                idx = self.due_index(msec + i * TICK_MSEC)
+                if (idx > self._shown_idx) and (not upcoming or upcoming[-1] != idx):
+                    upcoming.append(idx)
+            self._request(upcoming)
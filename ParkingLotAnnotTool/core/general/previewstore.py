@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+from typing import List, Optional
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QCoreApplication, QThread, pyqtSignal
+
+PREVIEW_DIR_NAME = "preview"
+# Same scale as VideoCropWorker's default preview_scale; JPEG can decode at 1/2 directly.
+PREVIEW_DECODE_FLAG = cv2.IMREAD_REDUCED_COLOR_2
+
+
+def read_preview(raw_dir: Path, preview_dir: Path, file_name: str) -> Optional[np.ndarray]:
+    """Half-resolution frame: the stored preview if there is one, else a reduced decode of the raw frame."""
+    preview_path = preview_dir / file_name
+    if preview_path.exists():
+        img = cv2.imread(str(preview_path), cv2.IMREAD_COLOR)
+        if img is not None:
+            return img
+    return cv2.imread(str(raw_dir / file_name), PREVIEW_DECODE_FLAG)
+
+
+class PreviewBuildWorker(QThread):
+    """Write preview/<frame>.jpg for every raw frame that has none yet.
+
+    Previews are written to a temporary name and renamed, so a reader never
+    sees a partially written file.
+    """
+    progress = pyqtSignal(int)
+    finished = pyqtSignal()
+    canceled = pyqtSignal()
+
+    def __init__(self, raw_dir: Path, preview_dir: Path, file_names: List[str], quality=90):
+        super().__init__()
+        self.raw_dir = Path(raw_dir)
+        self.preview_dir = Path(preview_dir)
+        self.file_names = file_names
+        self.quality = quality
+        self._is_canceled = False
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.stop)
+
+    def run(self):
+        os.makedirs(self.preview_dir, exist_ok=True)
+        with os.scandir(self.preview_dir) as entries:
+            existing = {entry.name for entry in entries}
+        total_frames = len(self.file_names)
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        for frame_idx, file_name in enumerate(self.file_names):
+            if self._is_canceled:
+                self.canceled.emit()
+                return
+            if file_name in existing:
+                continue
+            img = cv2.imread(str(self.raw_dir / file_name), PREVIEW_DECODE_FLAG)
+            if img is None:
+                continue
+            ok, buffer = cv2.imencode(".jpg", img, params)
+            if not ok:
+                continue
+            preview_path = self.preview_dir / file_name
+            tmp_path = preview_path.with_name(file_name + ".part")
+            try:
+                with open(tmp_path, 'wb') as file:
+                    file.write(buffer.tobytes())
+                os.replace(tmp_path, preview_path)
+            except OSError:
+                # Read-only datasets keep decoding the raw frames at reduced size.
+                self.canceled.emit()
+                return
+            self.progress.emit(int((frame_idx / total_frames) * 100))
+        self.finished.emit()
+
+    def cancel(self):
+        self._is_canceled = True
+
+    def stop(self):
+        self.cancel()
+        self.wait()
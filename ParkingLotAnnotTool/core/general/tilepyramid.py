@@ -0,0 +1,169 @@
+import math
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PyQt6.QtCore import QObject, QRectF, pyqtSignal
+from PyQt6.QtGui import QImage, QPainter, QPixmap
+
+from .framecache import FrameCache, FramePrefetcher
+
+TILE_SIZE = 512
+# Images whose long side is at most this are drawn from the full pixmap.
+PYRAMID_MIN_SIDE = 4096
+# Tile pixmaps kept on the GUI thread; a 1080p viewport shows about 20 tiles.
+MAX_TILE_PIXMAPS = 96
+
+
+class TilePyramid:
+    """Downsample levels of one image, cut into TILE_SIZE tiles.
+
+    Level n is the image shrunk by 2**n, down to the level that fits in one
+    tile. Levels are computed on first use by load_tile(), which is meant to
+    run on a single background thread.
+    """
+
+    def __init__(self, img: np.ndarray, tile_size: int = TILE_SIZE):
+        self._img = img
+        self._tile_size = tile_size
+        self._levels = {0: img}
+        height, width = img.shape[:2]
+        self._num_levels = 1
+        while max(width, height) > tile_size:
+            width = (width + 1) // 2
+            height = (height + 1) // 2
+            self._num_levels += 1
+
+    def width(self) -> int:
+        return self._img.shape[1]
+
+    def height(self) -> int:
+        return self._img.shape[0]
+
+    def num_levels(self) -> int:
+        return self._num_levels
+
+    def level_size(self, level: int) -> Tuple[int, int]:
+        width, height = self.width(), self.height()
+        for _ in range(level):
+            width = (width + 1) // 2
+            height = (height + 1) // 2
+        return width, height
+
+    def level_for_scale(self, scale: float) -> int:
+        """Coarsest level that still has at least one pixel per screen pixel."""
+        if scale >= 1.0:
+            return 0
+        return min(int(math.floor(math.log2(1.0 / scale))), self._num_levels - 1)
+
+    def level_array(self, level: int) -> np.ndarray:
+        img = self._levels.get(level)
+        if img is None:
+            prev = self.level_array(level - 1)
+            img = cv2.resize(prev, self.level_size(level), interpolation=cv2.INTER_AREA)
+            self._levels[level] = img
+        return img
+
+    def load_tile(self, level: int, tx: int, ty: int) -> np.ndarray:
+        t = self._tile_size
+        img = self.level_array(level)
+        # A copy, so a cached tile does not keep its level alive.
+        return img[ty * t:(ty + 1) * t, tx * t:(tx + 1) * t].copy()
+
+    def visible_tiles(self, level: int, rect: QRectF) -> List[Tuple[int, int, QRectF]]:
+        """Tiles of level overlapping rect (image coordinates), with their image-space rects."""
+        t = self._tile_size
+        level_width, level_height = self.level_size(level)
+        sx = self.width() / level_width
+        sy = self.height() / level_height
+        tx0 = max(int(rect.left() / sx) // t, 0)
+        ty0 = max(int(rect.top() / sy) // t, 0)
+        tx1 = min(int(math.ceil(rect.right() / sx)) // t, (level_width - 1) // t)
+        ty1 = min(int(math.ceil(rect.bottom() / sy)) // t, (level_height - 1) // t)
+        tiles = []
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                w = min(t, level_width - tx * t)
+                h = min(t, level_height - ty * t)
+                tiles.append((tx, ty, QRectF(tx * t * sx, ty * t * sy, w * sx, h * sy)))
+        return tiles
+
+
+class TilePyramidRenderer(QObject):
+    """Draw large images from a TilePyramid built in the background.
+
+    Tiles that are not loaded yet are drawn from the full pixmap, and
+    tile_loaded asks the canvas to repaint once they arrive. Tiles are keyed
+    (generation, level, tx, ty), where the generation counts set_image()
+    calls; keys never hold the pyramid, so stale tiles do not keep a
+    replaced image alive.
+    """
+    tile_loaded = pyqtSignal()
+
+    def __init__(self, max_mbytes: float = 128):
+        super().__init__()
+        self._pyramid: Optional[TilePyramid] = None
+        self._generation = 0
+        self._tile_cache = FrameCache(max_mbytes=max_mbytes)
+        self._pixmaps = OrderedDict()
+        self._loader = FramePrefetcher(self._tile_cache, self.load_tile)
+        self._loader.loaded.connect(self.on_tile_loaded)
+
+    def set_image(self, img: Optional[np.ndarray]) -> None:
+        # Drop the pending tiles of the previous image without waiting for the one loading.
+        self._loader.request([])
+        self._pixmaps.clear()
+        self._tile_cache.clear()
+        self._generation += 1
+        if (img is None) or (max(img.shape[:2]) <= PYRAMID_MIN_SIDE):
+            self._pyramid = None
+            return
+        self._pyramid = TilePyramid(img)
+
+    def is_active(self) -> bool:
+        return self._pyramid is not None
+
+    def load_tile(self, key) -> Optional[np.ndarray]:
+        # Runs on the loader thread. set_image() bumps the generation before it
+        # replaces the pyramid, so a pyramid read before the check matches key.
+        generation, level, tx, ty = key
+        pyramid = self._pyramid
+        if (pyramid is None) or (generation != self._generation):
+            return None
+        return pyramid.load_tile(level, tx, ty)
+
+    def on_tile_loaded(self, key) -> None:
+        if key[0] == self._generation:
+            self.tile_loaded.emit()
+
+    def tile_pixmap(self, key) -> Optional[QPixmap]:
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            return pixmap
+        tile = self._tile_cache.get(key)
+        if tile is None:
+            return None
+        qimg = QImage(tile.data, tile.shape[1], tile.shape[0], tile.strides[0], QImage.Format.Format_BGR888)
+        pixmap = QPixmap.fromImage(qimg)
+        self._pixmaps[key] = pixmap
+        while len(self._pixmaps) > MAX_TILE_PIXMAPS:
+            self._pixmaps.popitem(last=False)
+        return pixmap
+
+    def draw(self, painter: QPainter, rect: QRectF, scale: float, fallback: QPixmap) -> None:
+        """Draw the part of the image in rect (image coordinates) at the level matching scale."""
+        pyramid = self._pyramid
+        level = pyramid.level_for_scale(scale)
+        missing = []
+        for tx, ty, target in pyramid.visible_tiles(level, rect):
+            key = (self._generation, level, tx, ty)
+            pixmap = self.tile_pixmap(key)
+            if pixmap is None:
+                missing.append(key)
+                painter.drawPixmap(target, fallback, target)
+            else:
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+        if missing:
+            self._loader.request(missing)
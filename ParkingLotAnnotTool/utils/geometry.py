@@ -1,6 +1,7 @@
 from typing import Self
 from math import acos
 from math import sqrt
+import numpy as np
 from ParkingLotAnnotTool.utils.math import *
 
 
@@ -58,4 +59,48 @@ def is_polygon_convex(
             got_positive = True
         if got_negative and got_positive:
             return False
-    return True
\ No newline at end of file
+    return True
+
+# Vectorized forms over quads stored as an (N, 4, 2) array of (x, y) vertices.
+
+def quad_areas(quads: np.ndarray) -> np.ndarray:
+    x = quads[..., 0]
+    y = quads[..., 1]
+    return np.abs(np.sum(x * np.roll(y, -1, axis=-1) - np.roll(x, -1, axis=-1) * y, axis=-1)) / 2.0
+
+
+def quads_are_convex(quads: np.ndarray) -> np.ndarray:
+    ba = quads - np.roll(quads, -1, axis=-2)
+    bc = np.roll(quads, -2, axis=-2) - np.roll(quads, -1, axis=-2)
+    cross = ba[..., 0] * bc[..., 1] - ba[..., 1] * bc[..., 0]
+    return ~((cross < 0).any(axis=-1) & (cross > 0).any(axis=-1))
+
+
+def nearest_vertex(
+        quads: np.ndarray,
+        x: float,
+        y: float
+        ) -> tuple[float | None, int | None, int | None]:
+    """(distance, quad index, vertex index) of the vertex nearest to (x, y)."""
+    if len(quads) == 0:
+        return None, None, None
+    dists = np.hypot(quads[..., 0] - x, quads[..., 1] - y)
+    i = int(np.argmin(dists))
+    return float(dists.flat[i]), i // 4, i % 4
+
+
+def points_in_triangles(x: float, y: float, p1: np.ndarray, p2: np.ndarray, p3: np.ndarray) -> np.ndarray:
+    x1, y1 = p1[..., 0], p1[..., 1]
+    x2, y2 = p2[..., 0], p2[..., 1]
+    x3, y3 = p3[..., 0], p3[..., 1]
+    s = y1 * x3 - x1 * y3 + (y3 - y1) * x + (x1 - x3) * y
+    t = x1 * y2 - y1 * x2 + (y1 - y2) * x + (x2 - x1) * y
+    a = -y2 * x3 + y1 * (x3 - x2) + x1 * (y2 - y3) + x2 * y3
+    inside = np.where(a < 0, (s <= 0) & (s + t >= a), (s >= 0) & (s + t <= a))
+    return ((s < 0) == (t < 0)) & inside
+
+
+def points_in_quads(quads: np.ndarray, x: float, y: float) -> np.ndarray:
+    """Whether (x, y) lies in each quad, tested as triangles (1, 2, 3) and (1, 4, 3)."""
+    p1, p2, p3, p4 = quads[:, 0], quads[:, 1], quads[:, 2], quads[:, 3]
+    return points_in_triangles(x, y, p1, p2, p3) | points_in_triangles(x, y, p1, p4, p3)
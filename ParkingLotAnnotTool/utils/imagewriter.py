@@ -0,0 +1,93 @@
+import os
+import queue
+import threading
+import cv2
+
+
+def default_num_workers() -> int:
+    # Leave one core for the decoder thread.
+    return max(1, min(8, (os.cpu_count() or 2) - 1))
+
+
+class ImageWriterPool:
+    """Encode and write images on a pool of threads.
+
+    submit() blocks once max_queue images are pending, so a fast producer cannot
+    buffer an unbounded number of decoded frames. cv2.imwrite releases the GIL,
+    so the threads encode in parallel with the producer.
+    """
+
+    def __init__(self, params=None, num_workers=None, max_queue=None, on_written=None):
+        self.params = [] if params is None else params
+        self.num_workers = default_num_workers() if num_workers is None else max(1, num_workers)
+        if max_queue is None:
+            max_queue = self.num_workers * 2
+        self.on_written = on_written
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._error = None
+        self._is_canceled = False
+        self._written = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.num_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.cancel()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._is_canceled or self._error is not None:
+                    continue
+                path, img, tag = item
+                if not cv2.imwrite(str(path), img, self.params):
+                    raise IOError(f"failed to write {path}")
+                with self._lock:
+                    self._written += 1
+                if self.on_written is not None:
+                    self.on_written(tag)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, path, img, tag=None):
+        self._raise_if_failed()
+        self._queue.put((path, img, tag))
+
+    def written(self) -> int:
+        return self._written
+
+    def _join(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def close(self):
+        """Wait until every submitted image is written."""
+        self._join()
+        self._raise_if_failed()
+
+    def cancel(self):
+        """Drop pending images and stop the threads."""
+        self._is_canceled = True
+        self._join()
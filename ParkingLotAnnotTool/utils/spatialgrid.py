@@ -0,0 +1,85 @@
+from math import floor
+from typing import Dict, Hashable, Set, Tuple
+
+from ParkingLotAnnotTool.utils.math import clip
+
+DEFAULT_CELL_SIZE = 128.0
+
+
+class UniformGrid:
+    """Uniform grid over axis-aligned bounding boxes, for sub-linear hit-testing.
+
+    Every key is registered in each cell its box overlaps; a query returns
+    the keys of the cells it touches, which the caller then tests exactly.
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self._cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._boxes: Dict[Hashable, Tuple[float, float, float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._boxes
+
+    def cell_size(self) -> float:
+        return self._cell_size
+
+    def set_cell_size(self, cell_size: float) -> None:
+        boxes = self._boxes
+        self._cell_size = cell_size
+        self.clear()
+        for key, box in boxes.items():
+            self.insert(key, *box)
+
+    def clear(self) -> None:
+        self._cells = {}
+        self._boxes = {}
+
+    def _cell_range(self, xmin: float, ymin: float, xmax: float, ymax: float):
+        c = self._cell_size
+        return (floor(xmin / c), floor(ymin / c), floor(xmax / c), floor(ymax / c))
+
+    def insert(self, key: Hashable, xmin: float, ymin: float, xmax: float, ymax: float) -> None:
+        if key in self._boxes:
+            self.remove(key)
+        self._boxes[key] = (xmin, ymin, xmax, ymax)
+        cx0, cy0, cx1, cy1 = self._cell_range(xmin, ymin, xmax, ymax)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                self._cells.setdefault((cx, cy), set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        box = self._boxes.pop(key, None)
+        if box is None:
+            return
+        cx0, cy0, cx1, cy1 = self._cell_range(*box)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                cell = self._cells.get((cx, cy))
+                if cell is None:
+                    continue
+                cell.discard(key)
+                if not cell:
+                    del self._cells[(cx, cy)]
+
+    def query(self, x: float, y: float, radius: float = 0.0) -> Set[Hashable]:
+        """Keys whose box may lie within radius of (x, y)."""
+        cx0, cy0, cx1, cy1 = self._cell_range(x - radius, y - radius, x + radius, y + radius)
+        keys = set()
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                cell = self._cells.get((cx, cy))
+                if cell:
+                    keys |= cell
+        return keys
+
+
+def cell_size_for_boxes(sizes: list) -> float:
+    """Cell size of about one typical box, so that a box spans a few cells."""
+    if not sizes:
+        return DEFAULT_CELL_SIZE
+    sizes = sorted(sizes)
+    return clip(sizes[len(sizes) // 2], 32.0, 512.0)
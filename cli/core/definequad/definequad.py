@@ -12,6 +12,7 @@ from PyQt6.QtCore import QCoreApplication
 sys.path.append(str(Path(__file__).parents[3]))
 from ParkingLotAnnotTool.core.definequad.videoextract import VideoExtractWorker
 from ParkingLotAnnotTool.core.definequad.imgcrop import ImageCropWorker
+from ParkingLotAnnotTool.core.definequad.videocrop import VideoCropWorker
 
 def main():
     parser = argparse.ArgumentParser()
@@ -20,6 +21,8 @@ def main():
     parser.add_argument('--input_json', type=str)
     parser.add_argument('--interval', type=int, default=60)
     parser.add_argument('--output_dir', type=str)
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--preview_scale', type=float, default=0.5, help='0 disables previews (extract_and_crop)')
     args = parser.parse_args()
 
     app = QCoreApplication(sys.argv)
@@ -29,15 +32,28 @@ def main():
         progress_bar.n = value
         progress_bar.refresh()
 
+    def report_error(message):
+        progress_bar.close()
+        print(f"failed: {message}", file=sys.stderr)
+        app.exit(1)
+
     if   args.cmd=="extract_frames":
         worker = VideoExtractWorker(Path(args.input_video), Path(args.output_dir), args.interval)
         worker.progress.connect(update_progress)
         worker.finished.connect(app.quit)
+        worker.error.connect(report_error)
         worker.start()
     elif args.cmd=="crop_images":
-        worker = ImageCropWorker(Path(args.input_json))
+        worker = ImageCropWorker(Path(args.input_json), jobs=args.jobs)
+        worker.progress.connect(update_progress)
+        worker.finished.connect(app.quit)
+        worker.start()
+    elif args.cmd=="extract_and_crop":
+        preview_scale = args.preview_scale if args.preview_scale > 0 else None
+        worker = VideoCropWorker(Path(args.input_video), Path(args.input_json), args.interval, preview_scale=preview_scale)
         worker.progress.connect(update_progress)
         worker.finished.connect(app.quit)
+        worker.error.connect(report_error)
         worker.start()
 
     sys.exit(app.exec())
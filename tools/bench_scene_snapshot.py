@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Measure the Python work SceneData does per slider step.
+
+Every step runs the queries of SceneDataInfoWidget.update and
+ClassifySceneWidget.refresh, once through the shared per-frame snapshot and
+once through the linear scans they used before it.
+"""
+import argparse
+import cProfile
+import pstats
+import random
+import sys
+import time
+from pathlib import Path
+
+from loguru import logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ParkingLotAnnotTool.core.classifyscene.scenedata import SceneData
+
+
+def make_scene_data(num_lots: int, num_frames: int, num_scenes: int, num_difficult: int) -> SceneData:
+    rng = random.Random(0)
+    scene_data = SceneData()
+    scene_data._lots = [{"id": f"L{i}", "quad": [0, 0, 10, 0, 10, 10, 0, 10]} for i in range(num_lots)]
+    scene_data._scenes = {}
+    scene_data._difficult_frames = {}
+    for lot in scene_data._lots:
+        frames = sorted(rng.sample(range(num_frames), num_scenes))
+        scene_data._scenes[lot["id"]] = [
+            {"label": rng.choice(["free", "busy"]), "frame": f"{f:05d}",
+             "flags": ["occluded"] if rng.random() < 0.1 else []} for f in frames]
+        scene_data._difficult_frames[lot["id"]] = [
+            {"label": rng.choice(["person", "ambiguous"]), "frame": f"{rng.randrange(num_frames):05d}"}
+            for _ in range(num_difficult)]
+    scene_data.build_scene_index()
+    scene_data.bump_data_version()
+    scene_data._selected_lot_idx = 0
+    return scene_data
+
+
+def legacy_prev_scene(scene_data: SceneData):
+    prev_scene = None
+    for scene in scene_data.scenes_with_current_lot_id():
+        if scene["frame"] <= scene_data.current_frame():
+            prev_scene = scene
+    return prev_scene
+
+
+def legacy_difficult(scene_data: SceneData, label: str) -> bool:
+    for difficult_frame in scene_data.difficult_frames_with_current_lot_id():
+        if (difficult_frame["frame"] == scene_data.current_frame()) and (difficult_frame["label"] == label):
+            return True
+    return False
+
+
+def legacy_step(scene_data: SceneData):
+    # SceneDataInfoWidget.update -> info()
+    prev_scene = legacy_prev_scene(scene_data)
+    info = {
+        "frame": scene_data.current_frame(),
+        "label": None if prev_scene is None else prev_scene["label"],
+        "num scenes": len(scene_data.scenes_with_current_lot_id()),
+        "num occluded\nscenes": sum(1 for scene in scene_data.scenes_with_current_lot_id()
+                                    if "occluded" in scene["flags"]),
+        "is ambiguous": legacy_difficult(scene_data, "ambiguous"),
+        "person exists": legacy_difficult(scene_data, "person")}
+    # ClassifySceneWidget.refresh
+    prev_scene = legacy_prev_scene(scene_data)
+    flags = () if prev_scene is None else tuple(prev_scene["flags"])
+    return info, flags, legacy_difficult(scene_data, "ambiguous"), legacy_difficult(scene_data, "person")
+
+
+def snapshot_step(scene_data: SceneData):
+    info = scene_data.info()
+    state = scene_data.frame_state()
+    return info, state.prev_flags, state.is_ambiguous, state.person_exists
+
+
+def run(scene_data: SceneData, step, num_frames: int):
+    for frame_idx in range(num_frames):
+        scene_data._current_frame = f"{frame_idx:05d}"
+        step(scene_data)
+
+
+def measure(name: str, scene_data: SceneData, step, num_frames: int) -> None:
+    start = time.perf_counter()
+    run(scene_data, step, num_frames)
+    elapsed = time.perf_counter() - start
+    profile = cProfile.Profile()
+    profile.runcall(run, scene_data, step, num_frames)
+    calls = pstats.Stats(profile).total_calls
+    logger.info("{:9s}: {:8.2f} us/step, {:7.1f} function calls/step",
+                name, elapsed / num_frames * 1e6, calls / num_frames)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the SceneData per-frame snapshot")
+    parser.add_argument("--lots", type=int, default=20, help="number of lots")
+    parser.add_argument("--frames", type=int, default=5000, help="number of frames stepped through")
+    parser.add_argument("--scenes", type=int, default=500, help="scenes per lot")
+    parser.add_argument("--difficult", type=int, default=200, help="difficult frames per lot")
+    args = parser.parse_args()
+
+    scene_data = make_scene_data(args.lots, args.frames, args.scenes, args.difficult)
+    for frame_idx in range(args.frames):
+        scene_data._current_frame = f"{frame_idx:05d}"
+        assert legacy_step(scene_data) == snapshot_step(scene_data)
+    measure("legacy", scene_data, legacy_step, args.frames)
+    measure("snapshot", scene_data, snapshot_step, args.frames)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Measure the per-frame cost of uploading a BGR frame to CanvasPicture.
+
+"before" is the former flatten() + QPixmap.fromImage path, "after" is
+CanvasPicture.set_picture, which wraps the array and reuses the pixmap.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtWidgets import QApplication
+
+from ParkingLotAnnotTool.core.general.canvas import CanvasPicture
+
+
+def upload_before(canvas: CanvasPicture, img: np.ndarray) -> None:
+    qimg = QImage(img.flatten(), img.shape[1], img.shape[0], QImage.Format.Format_BGR888)
+    canvas.pixmap = QPixmap.fromImage(qimg)
+    canvas.update()
+
+
+def upload_after(canvas: CanvasPicture, img: np.ndarray) -> None:
+    canvas.set_picture(img)
+
+
+def measure(name: str, canvas: CanvasPicture, upload, frames: list, repeat: int) -> None:
+    upload(canvas, frames[0])
+    start = time.perf_counter()
+    for i in range(repeat):
+        upload(canvas, frames[i % len(frames)])
+    elapsed = time.perf_counter() - start
+    logger.info("{:6s}: {:7.2f} ms/frame", name, elapsed / repeat * 1e3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CanvasPicture.set_picture")
+    parser.add_argument("--width", type=int, default=3840, help="frame width")
+    parser.add_argument("--height", type=int, default=2160, help="frame height")
+    parser.add_argument("--repeat", type=int, default=100, help="frames uploaded per run")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(4)]
+    logger.info("{}x{} BGR frames, {:.1f} MB each", args.width, args.height, frames[0].nbytes / 1e6)
+    measure("before", CanvasPicture(), upload_before, frames, args.repeat)
+    measure("after", CanvasPicture(), upload_after, frames, args.repeat)
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
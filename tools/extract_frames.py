@@ -3,20 +3,131 @@
 import argparse
 import sys
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import Optional
 
 import cv2
 from loguru import logger
 from natsort import natsorted
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ParkingLotAnnotTool.utils.imagewriter import ImageWriterPool
+
+def read_text_names(video_path: Path) -> list[str]:
+    """Read frame names from the .txt file next to video_path."""
+    names = []
+    text_path = video_path.with_suffix('.txt')
+    if not text_path.exists():
+        logger.warning("Text file '{}' not found, falling back to sequential naming", text_path.name)
+        return names
+    with text_path.open('r', encoding='utf-8') as f:
+        for line in f:
+            match = re.search(r"record/([^/]+)/raw\.jpg", line)
+            if match:
+                names.append(match.group(1))
+            else:
+                logger.warning("Line didn't match expected pattern: {}", line.strip())
+    return names
+
+
+def count_frames(video_path: Path) -> int:
+    """Count the frames of a video without decoding them.
+
+    The capture is opened in raw mode (CAP_PROP_FORMAT=-1), so grab() only demuxes
+    packets. Falls back to CAP_PROP_FRAME_COUNT when raw mode is unavailable.
+    """
+    cap = cv2.VideoCapture(str(video_path), cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    if not cap.isOpened():
+        return 0
+    if cap.get(cv2.CAP_PROP_FORMAT) != -1:
+        logger.warning("Raw demuxing unavailable for '{}', using the frame count of its header", video_path.name)
+        count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        return count
+    count = 0
+    while cap.grab():
+        count += 1
+    cap.release()
+    return count
+
+
+def extract_video(
+    video_path: Path,
+    dst_dir: Path,
+    use_text_names: bool,
+    frame_offset: int,
+    writer: ImageWriterPool,
+    max_frames: Optional[int] = None,
+) -> int:
+    """Extract every frame of one video, numbering them from frame_offset.
+    Only the first max_frames frames are written; the rest are counted, not decoded.
+    Returns the number of frames in the video, or -1 if the video could not be opened.
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        logger.warning("Failed to open video '{}', skipping", video_path.name)
+        return -1
+
+    # Prepare naming list if requested
+    names = read_text_names(video_path) if use_text_names else []
+
+    local_idx = 0
+    while max_frames is None or local_idx < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        if use_text_names and local_idx < len(names):
+            out_name = f"{names[local_idx]}.jpg"
+        else:
+            out_name = f"{frame_offset + local_idx:05d}.jpg"
+            if use_text_names and local_idx >= len(names):
+                logger.warning(
+                    "More frames than names for '{}', using sequential for remaining", video_path.name
+                )
+
+        out_path = dst_dir / out_name
+        writer.submit(out_path, frame)
+        local_idx += 1
+
+    # Frames past max_frames would take the names of the next video's frames.
+    while max_frames is not None and local_idx >= max_frames and cap.grab():
+        local_idx += 1
+
+    cap.release()
+    return local_idx
+
+
+def extract_video_job(
+    video_path: Path,
+    dst_dir: Path,
+    jpeg_params: list[int],
+    use_text_names: bool,
+    frame_offset: int,
+    max_frames: int,
+    num_writers: int,
+) -> int:
+    """Process pool entry point: extract one video with its own writer pool."""
+    with ImageWriterPool(jpeg_params, num_writers) as writer:
+        return extract_video(
+            video_path, dst_dir, use_text_names,
+            frame_offset, writer, max_frames)
+
+
 def extract_frames(
     src_dir: Path,
     dst_dir: Path,
     jpeg_quality: int,
     use_text_names: bool,
+    num_writers: Optional[int] = None,
+    jobs: int = 1,
 ) -> None:
     """Extract all frames from every .mp4 in src_dir and save as JPEGs in dst_dir.
     If use_text_names is True, use corresponding .txt file for naming frames by timestamp.
+    Frames are decoded on the calling thread and encoded/written by num_writers threads.
+    With jobs > 1 the videos are decoded in parallel processes (see extract_frames_parallel).
     """
     dst_dir.mkdir(parents=True, exist_ok=True)
     jpeg_params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
@@ -25,52 +136,69 @@ def extract_frames(
     mp4_files = [p for p in src_dir.iterdir() if p.is_file() and p.suffix.lower() == '.mp4']
     mp4_files = natsorted(mp4_files)
 
+    if jobs > 1:
+        extract_frames_parallel(mp4_files, dst_dir, jpeg_params, use_text_names, num_writers, jobs)
+        return
+
+    writer = ImageWriterPool(jpeg_params, num_writers)
     frame_counter = 0
     for video_path in mp4_files:
         logger.info("Processing video '{}'", video_path.name)
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
-            logger.warning("Failed to open video '{}', skipping", video_path.name)
+        num_frames = extract_video(video_path, dst_dir, use_text_names, frame_counter, writer)
+        if num_frames < 0:
             continue
+        frame_counter += num_frames
+        logger.info("Finished '{}' (total frames so far {})", video_path.name, frame_counter)
 
-        # Prepare naming list if requested
-        names = []
-        if use_text_names:
-            text_path = video_path.with_suffix('.txt')
-            if not text_path.exists():
-                logger.warning("Text file '{}' not found, falling back to sequential naming", text_path.name)
-            else:
-                with text_path.open('r', encoding='utf-8') as f:
-                    for line in f:
-                        match = re.search(r"record/([^/]+)/raw\.jpg", line)
-                        if match:
-                            names.append(match.group(1))
-                        else:
-                            logger.warning("Line didn't match expected pattern: {}", line.strip())
-
-        local_idx = 0
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            if use_text_names and local_idx < len(names):
-                out_name = f"{names[local_idx]}.jpg"
-            else:
-                out_name = f"{frame_counter:05d}.jpg"
-                if use_text_names and local_idx >= len(names):
-                    logger.warning(
-                        "More frames than names for '{}', using sequential for remaining", video_path.name
-                    )
+    writer.close()
 
-            out_path = dst_dir / out_name
-            cv2.imwrite(str(out_path), frame, jpeg_params)
 
-            frame_counter += 1
-            local_idx += 1
+def extract_frames_parallel(
+    mp4_files: list[Path],
+    dst_dir: Path,
+    jpeg_params: list[int],
+    use_text_names: bool,
+    num_writers: Optional[int],
+    jobs: int,
+) -> None:
+    """Extract several videos at once with the same output names as the serial run.
 
-        cap.release()
-        logger.info("Finished '{}' (total frames so far {})", video_path.name, frame_counter)
+    Every video is counted first (demux only), which fixes the global number of its
+    first frame. The videos are then decoded by a pool of processes.
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        counts = list(executor.map(count_frames, mp4_files))
+
+    offsets = []
+    frame_counter = 0
+    for video_path, count in zip(mp4_files, counts):
+        logger.info("Probed '{}': {} frames, first frame {:05d}", video_path.name, count, frame_counter)
+        offsets.append(frame_counter)
+        frame_counter += count
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(
+                extract_video_job, video_path, dst_dir, jpeg_params, use_text_names,
+                offset, count, num_writers or 1): (video_path, count)
+            for video_path, offset, count in zip(mp4_files, offsets, counts)
+            if count > 0}
+        for future in as_completed(futures):
+            video_path, count = futures[future]
+            num_frames = future.result()
+            # Numbering of the following videos assumed the probed count.
+            if num_frames > count:
+                logger.warning(
+                    "'{}' has {} frames but {} were probed, the last {} were not written; "
+                    "run with --jobs 1 to extract them",
+                    video_path.name, num_frames, count, num_frames - count)
+            elif num_frames != count:
+                logger.warning(
+                    "'{}' decoded {} of {} probed frames, output numbering differs from a serial run",
+                    video_path.name, num_frames, count)
+            logger.info("Finished '{}' ({} frames)", video_path.name, min(num_frames, count))
+
+    logger.info("Finished all videos (total frames {})", frame_counter)
 
 
 def main():
@@ -104,6 +232,18 @@ def main():
         action="store_true",
         help="use corresponding text files to name frames by timestamp"
     )
+    parser.add_argument(
+        "--writers", "-w",
+        type=int,
+        default=None,
+        help="number of JPEG encoder/writer threads (default: number of cores - 1, 1 per job with --jobs)"
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=1,
+        help="number of videos decoded in parallel processes"
+    )
     args = parser.parse_args()
 
     # overwrite log file on each run
@@ -117,8 +257,8 @@ def main():
 
     logger.info("Command: {}", " ".join(sys.argv))
     logger.info(
-        "Arguments: input_dir={}, output_dir={}, quality={}, log_file={}, use_text_names={} ",
-        args.input_dir, args.output_dir, args.quality, args.log_file, args.use_text_names
+        "Arguments: input_dir={}, output_dir={}, quality={}, log_file={}, use_text_names={}, writers={}, jobs={} ",
+        args.input_dir, args.output_dir, args.quality, args.log_file, args.use_text_names, args.writers, args.jobs
     )
 
     extract_frames(
@@ -126,6 +266,8 @@ def main():
         args.output_dir,
         args.quality,
         args.use_text_names,
+        args.writers,
+        args.jobs,
     )
 
     logger.info("Execution finished successfully.")